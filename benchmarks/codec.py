@@ -0,0 +1,93 @@
+"""Compare the payload codec with the stdlib json calls it replaced.
+
+Times decoding a p5 device list page and an event/3 report, and encoding a
+light command, with ``json`` as the integration used it (``json.dumps`` to a
+str that paho then encodes) and with the codec module (orjson when installed).
+
+    python benchmarks/codec.py
+"""
+from __future__ import annotations
+
+import importlib.util
+import json
+import pathlib
+import timeit
+
+CODEC_PATH = pathlib.Path(__file__).parents[1] / "custom_components" / "general_link" / "codec.py"
+
+
+def _load_codec():
+    """Load codec.py alone, the package itself needs Home Assistant."""
+    spec = importlib.util.spec_from_file_location("general_link_codec", CODEC_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _device(i: int) -> dict:
+    device = {
+        "sn": f"{0x5A000000 + i:X}",
+        "name": f"设备{i}",
+        "devType": (1, 2, 3, 7, 9, 11)[i % 6],
+        "room": i % 20 + 1,
+        "subgroup": i % 4,
+        "state": 1,
+        "on": i % 2,
+        "level": 0.75,
+        "kelvin": 4000,
+        "rgb": 16744448,
+        "travel": 0.5,
+        "workingTime": 123456 + i,
+        "powerSavings": 78.9,
+    }
+    if device["devType"] == 2:
+        device.update(relays=[1, 0, 1], relaysNames=["灯1", "灯2", "灯3"], relaysNum=3)
+    return device
+
+
+P5_PAGE = {
+    "seq": 1001,
+    "rspTo": "P/0/center",
+    "data": {"start": 0, "count": 40, "total": 400, "list": [_device(i) for i in range(40)]},
+}
+
+EVENT_3 = {
+    "seq": 7,
+    "data": [
+        {"sn": "5A000001", "on": 1, "level": 0.4},
+        {"sn": "5A000007", "a15": 1},
+        {"sn": "5A000002", "relays": [1, 1, 0]},
+        {"sn": "5A000003", "workingTime": 123500, "powerSavings": 79.1},
+    ],
+}
+
+LIGHT_COMMAND = {"seq": 1, "s": {"t": 101}, "data": {"sn": "5A000001", "on": 1, "level": 0.6, "kelvin": 4500}}
+
+
+def _bench(name: str, func, number: int) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"  {name:<24} {seconds * 1e6:8.2f} us")
+    return seconds
+
+
+def main() -> None:
+    codec = _load_codec()
+    backend = "orjson" if codec.orjson is not None else "json (orjson not installed)"
+    print(f"codec backend: {backend}")
+    cases = [
+        ("p5 page decode", codec.dumps(P5_PAGE), 2000),
+        ("event/3 decode", codec.dumps(EVENT_3), 50000),
+    ]
+    for name, raw, number in cases:
+        print(f"{name} ({len(raw)} bytes)")
+        before = _bench("json.loads", lambda: json.loads(raw), number)
+        after = _bench("codec.loads", lambda: codec.loads(raw), number)
+        print(f"  speedup {before / after:.1f}x")
+    print("light command encode")
+    before = _bench("json.dumps + encode", lambda: json.dumps(LIGHT_COMMAND).encode(), 50000)
+    after = _bench("codec.dumps", lambda: codec.dumps(LIGHT_COMMAND), 50000)
+    print(f"  speedup {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
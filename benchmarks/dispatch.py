@@ -0,0 +1,94 @@
+"""Time the delivery of a state change through the gateway's routing table.
+
+Routes 5000 stub entities, one per sn plus the three entities of the
+constant temperature panels and the two of the sensors, and times
+Gateway._async_route for an event/3 change, for a change none of the
+entities consumes, and for an unknown sn.
+
+Needs Home Assistant installed, like the integration:
+
+    python benchmarks/dispatch.py --entities 5000
+"""
+from __future__ import annotations
+
+import argparse
+import pathlib
+import sys
+import timeit
+import types
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1]))
+
+from custom_components.general_link.Gateway import Gateway  # noqa: E402
+
+
+class StubEntity:
+    """Only what the routing table reads from an entity."""
+
+    def __init__(self, unique_id: str, state_keys: frozenset[str]) -> None:
+        self.unique_id = unique_id
+        self.entity_id = f"stub.{unique_id}"
+        self.state_keys = state_keys
+        self.state: dict = {}
+
+    def async_discover(self, data: dict) -> bool:
+        changed = any(self.state.get(key) != value for key, value in data.items())
+        self.state.update(data)
+        return changed
+
+
+def build_routes(count: int) -> tuple[dict, list[str]]:
+    """Route count entities, grouped by sn like the platforms register them."""
+    routes: dict[str, dict[str, StubEntity]] = {}
+    sns = []
+    created = 0
+    i = 0
+    while created < count:
+        sn = f"{0x5A000000 + i:X}"
+        kind = i % 10
+        if kind == 9:
+            entities = [
+                StubEntity(sn, frozenset({"a64", "a65", "a66", "a67", "a19", "a20"})),
+                StubEntity(f"{sn}H", frozenset({"a113", "a114", "a109", "a19", "a20"})),
+                StubEntity(f"{sn}F", frozenset({"a115", "a116", "a109"})),
+            ]
+        elif kind == 7:
+            entities = [StubEntity(sn, frozenset({"a14"})), StubEntity(f"{sn}M", frozenset({"a15"}))]
+        else:
+            entities = [StubEntity(sn, frozenset({"on", "level", "kelvin", "rgb"}))]
+        for entity in entities[:count - created]:
+            routes.setdefault(sn, {})[entity.unique_id] = entity
+            created += 1
+        sns.append(sn)
+        i += 1
+    return routes, sns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--entities", type=int, default=5000)
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    routes, sns = build_routes(args.entities)
+    written = []
+    gateway = types.SimpleNamespace(_routes=routes, _async_schedule_write=written.append)
+    route = Gateway._async_route
+
+    panel = next(sn for sn in sns if len(routes[sn]) == 3)
+    light = next(sn for sn in sns if len(routes[sn]) == 1)
+    level = iter(range(1 << 62))
+    cases = [
+        ("light change", lambda: route(gateway, light, {"sn": light, "level": next(level)})),
+        ("panel change, 3 entities", lambda: route(gateway, panel, {"sn": panel, "a19": next(level)})),
+        ("energy-only change", lambda: route(gateway, light, {"sn": light, "workingTime": 1})),
+        ("unknown sn", lambda: route(gateway, "FFFFFFFF", {"sn": "FFFFFFFF", "on": 1})),
+    ]
+    print(f"{sum(len(entities) for entities in routes.values())} entities on {len(sns)} sns")
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print(f"  {name:<26} {seconds * 1e9:8.0f} ns/event")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Compare the threaded and the asyncio MQTT transports of the integration.
+
+A publisher sends timestamped messages through a broker to a subscriber
+driven either by paho's loop_start thread, whose messages are handed to the
+event loop like MqttClient does, or by the event loop itself through
+add_reader/add_writer. For each transport the messages received per second
+and the delivery latency percentiles are printed.
+
+Needs paho-mqtt and a reachable broker:
+
+    python benchmarks/mqtt_transport.py --host 127.0.0.1 --count 20000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import struct
+import time
+
+from paho.mqtt import client as mqtt
+
+TOPIC = "benchmark/general_link/transport"
+MISC_LOOP_INTERVAL = 1
+MAX_PACKETS_TO_READ = 500
+
+
+def _client() -> mqtt.Client:
+    client_id = f"general-link-bench-{random.randint(0, 1 << 30)}"
+    try:
+        return mqtt.Client(client_id=client_id)
+    except Exception:  # paho-mqtt 2
+        return mqtt.Client(client_id=client_id, callback_api_version=mqtt.CallbackAPIVersion.VERSION1)
+
+
+class Receiver:
+    """Subscriber recording the latency of each message once it reached the event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, args: argparse.Namespace) -> None:
+        self.loop = loop
+        self.args = args
+        self.count = args.count
+        self.latencies: list[float] = []
+        self.last_at = 0.0
+        self.subscribed = loop.create_future()
+        self.finished = loop.create_future()
+        self.client = _client()
+        self.client.on_connect = self._on_connect
+        self.client.on_subscribe = self._on_subscribe
+
+    def _on_connect(self, client, _userdata, _flags, result_code) -> None:
+        client.subscribe(TOPIC, self.args.qos)
+
+    def _on_subscribe(self, _client, _userdata, _mid, _granted_qos) -> None:
+        self.loop.call_soon_threadsafe(self._set_result, self.subscribed)
+
+    @staticmethod
+    def _set_result(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    def _record(self, sent_at: float) -> None:
+        now = time.perf_counter()
+        self.latencies.append(now - sent_at)
+        self.last_at = now
+        if len(self.latencies) == self.count:
+            self._set_result(self.finished)
+
+    async def async_start(self) -> None:
+        raise NotImplementedError
+
+    async def async_stop(self) -> None:
+        raise NotImplementedError
+
+
+class ThreadedReceiver(Receiver):
+    """paho's network thread reads the socket, every message hops to the loop."""
+
+    async def async_start(self) -> None:
+        self.client.on_message = lambda _c, _u, msg: self.loop.call_soon_threadsafe(
+            self._record, struct.unpack_from("<d", msg.payload)[0]
+        )
+        await self.loop.run_in_executor(None, self.client.connect, self.args.host, self.args.port, 60)
+        self.client.loop_start()
+
+    async def async_stop(self) -> None:
+        self.client.disconnect()
+        await self.loop.run_in_executor(None, self.client.loop_stop)
+
+
+class AsyncioReceiver(Receiver):
+    """The event loop reads the socket, messages are handled where they are read."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, args: argparse.Namespace) -> None:
+        super().__init__(loop, args)
+        self._misc_timer: asyncio.TimerHandle | None = None
+
+    def _misc_loop(self) -> None:
+        self.client.loop_misc()
+        self._misc_timer = self.loop.call_later(MISC_LOOP_INTERVAL, self._misc_loop)
+
+    def _call(self, target, *args) -> None:
+        """Run socket bookkeeping in the loop, paho calls back from the executor during connect."""
+        try:
+            in_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            target(*args)
+        else:
+            self.loop.call_soon_threadsafe(target, *args)
+
+    def _on_socket_open(self, _client, _userdata, sock) -> None:
+        self._call(self.loop.add_reader, sock, self.client.loop_read, MAX_PACKETS_TO_READ)
+        self._call(self.loop.add_writer, sock, self.client.loop_write)
+
+    def _on_socket_close(self, _client, _userdata, sock) -> None:
+        self._call(self.loop.remove_reader, sock.fileno())
+        self._call(self.loop.remove_writer, sock.fileno())
+
+    def _on_socket_register_write(self, _client, _userdata, sock) -> None:
+        self._call(self.loop.add_writer, sock, self.client.loop_write)
+
+    def _on_socket_unregister_write(self, _client, _userdata, sock) -> None:
+        self._call(self.loop.remove_writer, sock.fileno())
+
+    async def async_start(self) -> None:
+        self.client.on_message = lambda _c, _u, msg: self._record(struct.unpack_from("<d", msg.payload)[0])
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+        await self.loop.run_in_executor(None, self.client.connect, self.args.host, self.args.port, 60)
+        self._misc_loop()
+
+    async def async_stop(self) -> None:
+        if self._misc_timer is not None:
+            self._misc_timer.cancel()
+        self.client.disconnect()
+
+
+def publish(args: argparse.Namespace) -> float:
+    """Publish the messages from a thread, return when the first one was sent."""
+    publisher = _client()
+    publisher.connect(args.host, args.port, 60)
+    publisher.loop_start()
+    padding = b"x" * max(0, args.size - 8)
+    interval = 1 / args.rate if args.rate else 0
+    started_at = time.perf_counter()
+    for i in range(args.count):
+        if interval:
+            delay = started_at + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        publisher.publish(TOPIC, struct.pack("<d", time.perf_counter()) + padding, args.qos)
+    publisher.disconnect()
+    publisher.loop_stop()
+    return started_at
+
+
+async def run(receiver_class: type[Receiver], args: argparse.Namespace) -> None:
+    loop = asyncio.get_running_loop()
+    receiver = receiver_class(loop, args)
+    await receiver.async_start()
+    await asyncio.wait_for(receiver.subscribed, 10)
+    started_at = await loop.run_in_executor(None, publish, args)
+    try:
+        await asyncio.wait_for(receiver.finished, args.timeout)
+    except asyncio.TimeoutError:
+        pass
+    await receiver.async_stop()
+
+    latencies = sorted(receiver.latencies)
+    if not latencies:
+        print(f"{receiver_class.__name__:>16}: nothing received")
+        return
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{receiver_class.__name__:>16}: {len(latencies)}/{args.count} messages, "
+        f"{len(latencies) / (receiver.last_at - started_at):,.0f} msg/s, "
+        f"p50 {quantiles[49] * 1000:.2f} ms, p99 {quantiles[98] * 1000:.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=256, help="payload size in bytes")
+    parser.add_argument("--rate", type=float, default=0, help="messages per second, 0 for as fast as possible")
+    parser.add_argument("--qos", type=int, default=0, choices=(0, 1))
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+    for receiver_class in (ThreadedReceiver, AsyncioReceiver):
+        asyncio.run(run(receiver_class, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,83 @@
 """Define a gateway class for managing MQTT connections within the gateway"""
 
 import asyncio
-import json
+import itertools
 import logging
 import time
+from collections import deque
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_NAME, EVENT_HOMEASSISTANT_STOP
-from homeassistant.core import HomeAssistant, Event
+from homeassistant.core import HomeAssistant, Event, callback, CALLBACK_TYPE
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
 
+from . import codec
 from .mdns import MdnsScanner
-from .const import MQTT_CLIENT_INSTANCE, CONF_LIGHT_DEVICE_TYPE, EVENT_ENTITY_REGISTER, MQTT_TOPIC_PREFIX, \
-    EVENT_ENTITY_STATE_UPDATE, DEVICE_COUNT_MAX
-from .mqtt import MqttClient
+from .const import DOMAIN, MQTT_CLIENT_INSTANCE, CONF_LIGHT_DEVICE_TYPE, EVENT_ENTITY_REGISTER, MQTT_TOPIC_PREFIX, \
+    DEVICE_COUNT_MAX
+from .ingest import IngestQueue, INGEST_CRITICAL, INGEST_NORMAL, INGEST_BULK
+from .mqtt import MqttClient, PRIORITY_BACKGROUND
 
 _LOGGER = logging.getLogger(__name__)
 
+# Seconds to wait for the broker connection during init.
+INIT_CONNECT_TIMEOUT = 3
+
+# Seconds to wait for the response to a request sent with async_request.
+REQUEST_TIMEOUT = 10
+
+# Requests carry their correlation id in ``seq``, numbered from here so they
+# never collide with the fixed seq values the gateway and entities use.
+REQUEST_SEQ_START = 1000
+
+# Device list paging: pages requested at the same time once the total is known,
+# bounds of the page size and the latency and size a page should stay under.
+# A page slower or bigger than that halves the page size, one well under it
+# doubles it.
+PAGE_WINDOW = 4
+PAGE_SIZE_MIN = 20
+PAGE_SIZE_MAX = 500
+PAGE_TARGET_LATENCY = 1.0
+PAGE_TARGET_BYTES = 256 * 1024
+PAGE_RETRIES = 2
+
+# The inventory of the last sync is kept in .storage to create the entities at
+# startup, saving it is delayed to write a burst of changes at once.
+INVENTORY_STORAGE_VERSION = 1
+INVENTORY_SAVE_DELAY = 10
+
+# Seconds without device events before the light groups of their rooms are
+# synced, and the longest a steady stream of events may postpone the sync.
+GROUP_SYNC_DELAY = 1
+GROUP_SYNC_MAX_DELAY = 5
+
+# Keys of an event/3 change that only reports energy counters.
+ENERGY_KEYS = frozenset({"sn", "workingTime", "powerSavings"})
+
+# Payload keys the entities are named from, a change recreates the entities.
+NAME_KEYS = ("name", "room", "room_name", "relaysNames", "relaysNum")
+
+
+def inventory_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Storage of the device inventory of a config entry"""
+    return Store(hass, INVENTORY_STORAGE_VERSION, f"{DOMAIN}.inventory.{entry_id}")
+
+
+class _InventorySync:
+    """Entities and offline devices reported during one init, and whether every response arrived"""
+
+    __slots__ = ("synced", "offline_sns", "complete")
+
+    def __init__(self) -> None:
+        self.synced: set[tuple[str, str]] = set()
+        self.offline_sns: set[str] = set()
+        self.complete = True
+
 
 class Gateway:
     """Class for gateway and managing MQTT connections within the gateway"""
@@ -39,11 +100,50 @@ class Gateway:
 
         self.device_map = {}
 
+        """Rooms whose light groups are synced once the device events calm down"""
+        self._group_sync_rooms: set[int] = set()
+        self._group_sync_unsub: CALLBACK_TYPE | None = None
+        self._group_sync_since: float | None = None
+
         self.sns = []
 
+        """Merged state of every device by sn, event/3 deltas are applied to it"""
+        self.device_states: dict[str, dict] = {}
+        self._state_queries: set[str] = set()
+
+        """Device and light group changes waiting to be processed, and shed devices to fetch again"""
+        self.ingest = IngestQueue(hass, self._async_process_changes, self._async_change_shed)
+        self._shed_sns: set[str] = set()
+
+        """Requests waiting for their response, by seq and by response topic"""
+        self._request_seq = itertools.count(REQUEST_SEQ_START)
+        self._requests: dict[int, asyncio.Future] = {}
+        self._requests_by_topic: dict[str, deque[int]] = {}
+
+        """Inventory of the entity payloads by component and unique_id"""
+        self._store = inventory_store(hass, entry.entry_id)
+        self._inventory: dict[str, dict[str, dict]] = {}
+
+        """Entities created in this run for each payload, by component and payload unique_id"""
+        self.entities: dict[tuple[str, str], list[Entity]] = {}
+
+        """Entities receiving the state changes of each sn or light group, by their unique_id"""
+        self._routes: dict[str, dict[str, Entity]] = {}
+
+        """Entities whose state changed since the last write, written once per loop iteration"""
+        self._dirty_entities: dict[int, Entity] = {}
+        self._write_scheduled = False
+
+        """Device list page size, adapted to the gateway's responses"""
+        self._page_size = DEVICE_COUNT_MAX
+        self._page_cap = PAGE_SIZE_MAX
+
         """Lighting Control Type"""
         self.light_device_type = entry.data[CONF_LIGHT_DEVICE_TYPE]
 
+        """Options the MQTT client was created with, the entry is reloaded when they change"""
+        self.options = dict(entry.options)
+
         self.hass.data[MQTT_CLIENT_INSTANCE] = MqttClient(
             self.hass,
             self._entry,
@@ -70,183 +170,178 @@ class Gateway:
 
         mqtt_client: MqttClient = self.hass.data[MQTT_CLIENT_INSTANCE]
 
+        for future in self._requests.values():
+            future.cancel()
+        if self._group_sync_unsub is not None:
+            self._group_sync_unsub()
+            self._group_sync_unsub = None
+
         await mqtt_client.async_disconnect()
 
-    async def report_q5_init(self, device_list):
+    async def report_q5_init(self, device_list, sync: _InventorySync | None = None):
+        device_map_changed = False
         for device in device_list:
             device_type = device["devType"]
             device["unique_id"] = f"{device['sn']}"
 
+            self.device_states[device["sn"]] = dict(device)
+
             state = int(device["state"])
             if state == 0:
+                if sync is not None:
+                    sync.offline_sns.add(device["sn"])
                 continue
             if device_type == 3:
                 """Curtain"""
-                await self._add_entity("cover", device)
+                await self._add_entity("cover", device, sync)
             elif device_type == 1 and self.light_device_type == "single":
                 """Light"""
                 device["is_group"] = False
-                await self._add_entity("light", device)
+                await self._add_entity("light", device, sync)
             elif device_type == 11:
                 """Climate"""
-                await self._add_entity("climate", device)
+                await self._add_entity("climate", device, sync)
             elif device_type == 7:
                 """sensor"""
                 if "a14" in device:
-                   await self._add_entity("sensor", device)
+                   await self._add_entity("sensor", device, sync)
                 if "a15" in device:
-                   await self._add_entity("binary_sensor", device)
+                   await self._add_entity("binary_sensor", device, sync)
             elif device_type == 9:
                 """Constant Temperature Control Panel"""
                 a110 = int(device["a110"])
                 a111 = int(device["a111"])
                 a112 = int(device["a112"])
                 if a110 == 2 or a111 == 1 :
-                   await self._add_entity("climate", device)
+                   await self._add_entity("climate", device, sync)
                 if a112 == 1 :
-                   await self._add_entity("fan", device)
+                   await self._add_entity("fan", device, sync)
             elif device_type == 2:
                 """Switch"""
                 if "relays" in device and "relaysNames" in device and "relaysNum" in device:
-                    await self._add_entity("switch", device)
+                    await self._add_entity("switch", device, sync)
                 else:
                     self.sns.append(device['sn'])
             elif device_type == 5:
                 """MediaPlayer"""
-                await self._add_entity("media_player", device)
-            if "subgroup" in device:
-                self.device_map[device['sn']] = {
+                await self._add_entity("media_player", device, sync)
+            if "room" in device:
+                location = {
                     "room": device['room'],
-                    "subgroup": device['subgroup']
+                    "subgroup": device.get('subgroup')
                 }
+                if self.device_map.get(device['sn']) != location:
+                    self.device_map[device['sn']] = location
+                    device_map_changed = True
+        if device_map_changed:
+            self._async_save_inventory()
 
     async def _async_mqtt_subscribe(self, msg):
         """Process received MQTT messages"""
 
-        payload = msg.payload
+        payload = msg.parsed_payload
         topic = msg.topic
 
-        if payload:
-            try:
-                payload = json.loads(payload)
-            except ValueError:
-                _LOGGER.warning("Unable to parse JSON: '%s'", payload)
-                return
-        else:
-            _LOGGER.warning("JSON None")
+        if self._resolve_request(msg):
             return
 
         if topic.endswith("p5"):
-            seq = payload["seq"]
-            start = payload["data"]["start"]
-            count = payload["data"]["count"]
-            total = payload["data"]["total"]
-
-            """Device List data"""
-            device_list = payload["data"]["list"]
-
-            if seq == 1:
-                await self.report_q5_init(device_list)
-                if start + count < total:
-                    data = {
-                        "start": start + count,
-                        "max": DEVICE_COUNT_MAX,
-                        "devTypes": self.devTypes,
-                    }
-                    await self._async_mqtt_publish("P/0/center/q5", data, seq)
-            elif seq == 2:
-                await self.report_q5_init(device_list)
-                if start + count < total:
-                    data = {
-                        "start": start + count,
-                        "max": DEVICE_COUNT_MAX,
-                        "sns": self.sns,
-                    }
-                    await self._async_mqtt_publish("P/0/center/q5", data, seq)
-            elif seq == 3:
-                for device in device_list:
-                    await self._exec_event_3(device)
+            """Device List data that nobody waits for any more, only its states are used"""
+            for device in payload["data"]["list"]:
+                self.device_states[device["sn"]] = device
+                self.ingest.async_put(device["sn"], device, INGEST_BULK)
 
         elif topic.endswith("p28"):
-            """Scene List data"""
-            scene_list = payload["data"]
-            room_map = self.room_map
-            for scene in scene_list:
-                scene["unique_id"] = f"{scene['id']}"
-                room_id = scene["room"]
-                if room_id == 0:
-                    scene["room_name"] = "整屋"
-                else:
-                    scene["room_name"] = room_map.get(room_id, {}).get('name', "未知房间")
-                await self._add_entity("scene", scene)
-        elif topic.endswith("event/3"):
-            """Device state data"""
-            stats_list = payload["data"]
-
-            string_array = ["sn", "workingTime", "powerSavings"]
-
-            flag = False
-
-            sns = []
-
-            for state in stats_list:
-                await self._exec_event_3(state)
-
-                sns.append(state["sn"])
-
-                if "workingTime" in state or "powerSavings" in state:
-                    for key in state.keys():
-                        if key not in string_array:
-                            flag = True
-                else:
-                    flag = True
-
-            if sns:
-                data = {
-                    "start": 0,
-                    "max": DEVICE_COUNT_MAX,
-                    "sns": sns,
-                }
-                await self._async_mqtt_publish("P/0/center/q5", data, 3)
-
-            if flag:
-                await self.sync_group_status(False)
-
-        elif topic.endswith("event/5"):
-            group_list = payload["data"]
-            for group in group_list:
-                if 'a7' in group and 'a8' in group and 'a9' in group:
-                    device_type = group['a7']
-                    room_id = group['a8']
-                    group_id = group['a9']
-                    data = {}
-                    if 'a10' in group:
-                        data['on'] = group['a10']
-                    if 'a11' in group:
-                        data['level'] = group['a11']
-                    if 'a12' in group:
-                        data['kelvin'] = group['a12']
-                    if 'a13' in group and group['a13'] != 0:
-                        data['rgb'] = group['a13']
-                    if device_type == 1 and data:
-                        await self._init_or_update_light_group(2, room_id, '', group_id, '', data)
-
+            await self._handle_p28(payload)
         elif topic.endswith("p33"):
-            """Basic data, including room information, light group information, curtain group information"""
-            for room in payload["data"]["rooms"]:
-                self.room_map[room["id"]] = room
-            for lightGroup in payload["data"]["lightsSubgroups"]:
-                self.light_group_map[lightGroup["id"]] = lightGroup
+            self._handle_p33(payload)
         elif topic.endswith("p31"):
-            """Relationship data for rooms and groups"""
-            self.room_list = []
-            for room in payload["data"]:
-                room_id = room["room"]
-                self.room_list.append(room_id)
-            await self.sync_group_status(True)
+            self._handle_p31(payload)
+            await self.sync_group_status(False)
         elif topic.endswith("p51"):
-            seq = payload["seq"]
-            for roomObj in payload["data"]:
+            await self._handle_p51(payload, payload["seq"])
+
+    def _resolve_request(self, msg) -> bool:
+        """Hand a response to the request waiting for it.
+
+        Responses are matched by the seq of their request, responses without a
+        seq go to the oldest request waiting on their topic.
+        """
+        waiting = self._requests_by_topic.get(msg.topic.rsplit("/", 1)[-1])
+        if not waiting:
+            return False
+        seq = msg.parsed_payload.get("seq")
+        if seq is None:
+            seq = waiting[0]
+        future = self._requests.get(seq)
+        if future is None:
+            return False
+        if not future.done():
+            future.set_result(msg)
+        return True
+
+    async def async_request(self, topic: str, data: object, timeout: float = REQUEST_TIMEOUT) -> dict:
+        """Send a query to the gateway and return its response payload.
+
+        Any number of requests may be waiting at the same time. Raises
+        asyncio.TimeoutError if no response arrives within ``timeout`` seconds;
+        a response arriving later is handled like an unsolicited message.
+        """
+        return (await self._async_request(topic, data, timeout)).parsed_payload
+
+    async def _async_request(self, topic: str, data: object, timeout: float):
+        """Send a query to the gateway and return the received response message"""
+        seq = next(self._request_seq)
+        response_topic = "p" + topic.rsplit("/", 1)[-1][1:]
+        future = self.hass.loop.create_future()
+        self._requests[seq] = future
+        waiting = self._requests_by_topic.setdefault(response_topic, deque())
+        waiting.append(seq)
+        try:
+            await self._async_mqtt_publish(topic, data, seq)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            del self._requests[seq]
+            waiting.remove(seq)
+            if not waiting:
+                del self._requests_by_topic[response_topic]
+
+    def _handle_p33(self, payload: dict):
+        """Basic data, including room information, light group information, curtain group information"""
+        room_map = dict(self.room_map)
+        for room in payload["data"]["rooms"]:
+            self.room_map[room["id"]] = room
+        for lightGroup in payload["data"]["lightsSubgroups"]:
+            self.light_group_map[lightGroup["id"]] = lightGroup
+        if self.room_map != room_map:
+            self._async_save_inventory()
+
+    async def _handle_p28(self, payload: dict, sync: _InventorySync | None = None):
+        """Scene List data"""
+        scene_list = payload["data"]
+        room_map = self.room_map
+        for scene in scene_list:
+            scene["unique_id"] = f"{scene['id']}"
+            room_id = scene["room"]
+            if room_id == 0:
+                scene["room_name"] = "整屋"
+            else:
+                scene["room_name"] = room_map.get(room_id, {}).get('name', "未知房间")
+            await self._add_entity("scene", scene, sync)
+
+    def _handle_p31(self, payload: dict):
+        """Relationship data for rooms and groups"""
+        room_list = self.room_list
+        self.room_list = []
+        for room in payload["data"]:
+            room_id = room["room"]
+            self.room_list.append(room_id)
+        if self.room_list != room_list:
+            self._async_save_inventory()
+
+    async def _handle_p51(self, payload: dict, seq: int, sync: _InventorySync | None = None):
+        """Light group data of the rooms, seq 1 registers the groups and anything else updates them"""
+        for roomObj in payload["data"]:
                 if "lights" in roomObj:
                     room_id = roomObj["id"]
                     lights = roomObj["lights"]
@@ -254,53 +349,190 @@ class Gateway:
                     light_group_id = 0
                     light_group_name = "所有灯"
                     await self._init_or_update_light_group(seq, room_id, room_name, light_group_id,
-                                                           light_group_name, lights)
+                                                           light_group_name, lights, sync)
                     if "subgroups" in lights:
                         for subgroupObj in lights["subgroups"]:
                             light_group_id = int(subgroupObj["id"])
                             light_group_name = subgroupObj["name"]
                             await self._init_or_update_light_group(seq, room_id, room_name, light_group_id,
-                                                                   light_group_name, subgroupObj)
+                                                                   light_group_name, subgroupObj, sync)
+
+    @callback
+    def _async_ingest_event(self, msg):
+        """Queue the device changes of event/3 and the light group changes of event/5"""
+        payload = msg.parsed_payload
+        if msg.topic.endswith("event/3"):
+            for state in payload["data"]:
+                self.ingest.async_put(state["sn"], state, self._change_priority(state))
+            return
+        for group in payload["data"]:
+            if 'a7' in group and 'a8' in group and 'a9' in group:
+                device_type = group['a7']
+                room_id = group['a8']
+                group_id = group['a9']
+                data = {}
+                if 'a10' in group:
+                    data['on'] = group['a10']
+                if 'a11' in group:
+                    data['level'] = group['a11']
+                if 'a12' in group:
+                    data['kelvin'] = group['a12']
+                if 'a13' in group and group['a13'] != 0:
+                    data['rgb'] = group['a13']
+                if device_type == 1 and data:
+                    self.ingest.async_put((room_id, group_id), data)
+
+    @staticmethod
+    def _change_priority(state: dict) -> int:
+        """Motion and relays drive automations, energy counters can wait"""
+        if "a15" in state or "relays" in state:
+            return INGEST_CRITICAL
+        if ENERGY_KEYS.issuperset(state):
+            return INGEST_BULK
+        return INGEST_NORMAL
+
+    @callback
+    def _async_change_shed(self, key, priority: int):
+        """A change was dropped from the full ingest queue, fetch the current state instead.
+
+        Bulk changes are full states fetched from the gateway or energy
+        counters, fetching them again would only add to the overload.
+        """
+        if priority == INGEST_BULK:
+            return
+        if isinstance(key, tuple):
+            self._group_sync_rooms.add(key[0])
+        else:
+            self._shed_sns.add(key)
 
-    async def _exec_event_3(self, data):
-        if "relays" in data:
-            for relay, is_on in enumerate(data["relays"]):
-                status = {
-                    "on": is_on
-                }
-                async_dispatcher_send(
-                    self.hass, EVENT_ENTITY_STATE_UPDATE.format(f"switch{data['sn']}{relay}"), status
-                )
-        #恒温多实体触发
-        elif "devType" in data:
-            if data["devType"] == 9:
-                 async_dispatcher_send(
-                   self.hass, EVENT_ENTITY_STATE_UPDATE.format(data["sn"]), data
-                 )
-                 async_dispatcher_send(
-                    self.hass, EVENT_ENTITY_STATE_UPDATE.format(data["sn"]+"H"), data
-                 )
-                 async_dispatcher_send(
-                    self.hass, EVENT_ENTITY_STATE_UPDATE.format(data["sn"]+"F"), data
-                 )
-            elif data["devType"] == 7:
-                async_dispatcher_send(
-                   self.hass, EVENT_ENTITY_STATE_UPDATE.format(data["sn"]+"L"), data
-                 )
-                async_dispatcher_send(
-                   self.hass, EVENT_ENTITY_STATE_UPDATE.format(data["sn"]+"M"), data
-                 )
+    async def _async_process_changes(self, changes: list):
+        """Apply a batch of merged changes, keyed by sn for devices and (room, subgroup) for light groups.
+
+        Bulk device records are full states fetched from the gateway, they do
+        not resync the light groups.
+        """
+        rooms = set()
+
+        sns = []
+
+        for key, state, priority in changes:
+            if isinstance(key, tuple):
+                await self._event_trigger(key[0], key[1], state)
+                continue
+
+            known = self.device_states.get(key)
+            if known is None:
+                sns.append(key)
             else:
-                async_dispatcher_send(
-                    self.hass, EVENT_ENTITY_STATE_UPDATE.format(data["sn"]), data
-                )
-        else:
-            async_dispatcher_send(
-                self.hass, EVENT_ENTITY_STATE_UPDATE.format(data["sn"]), data
-            )
+                known.update(state)
+            await self._exec_event_3(state)
+
+            if priority == INGEST_BULK:
+                flag = False
+            elif "workingTime" in state or "powerSavings" in state:
+                flag = not ENERGY_KEYS.issuperset(state)
+            else:
+                flag = True
+
+            if flag and rooms is not None:
+                """Only the rooms of the changed devices, all of them for a device not listed yet"""
+                if key in self.device_map:
+                    rooms.add(self.device_map[key]["room"])
+                elif known is None:
+                    rooms = None
+
+        if self._shed_sns:
+            sns.extend(self._shed_sns)
+            self._shed_sns = set()
+        for start in range(0, len(sns), DEVICE_COUNT_MAX):
+            self.hass.async_create_task(self._async_query_states(sns[start:start + DEVICE_COUNT_MAX]))
+
+        if rooms is None or rooms or self._group_sync_rooms:
+            self._async_schedule_group_sync(rooms)
+
+    async def _async_query_states(self, sns: list):
+        """Fetch the full state of devices missing from device_states, one query per sn at a time"""
+        sns = [sn for sn in sns if sn not in self._state_queries]
+        if not sns:
+            return
+        self._state_queries.update(sns)
+        data = {
+            "start": 0,
+            "max": DEVICE_COUNT_MAX,
+            "sns": sns,
+        }
+        try:
+            response = await self.async_request("P/0/center/q5", data)
+        except asyncio.TimeoutError:
+            _LOGGER.warning("No response to the state query of %s", sns)
+            return
+        finally:
+            self._state_queries.difference_update(sns)
+        for device in response["data"]["list"]:
+            self.device_states[device["sn"]] = device
+            self.ingest.async_put(device["sn"], device, INGEST_BULK)
+
+    async def _exec_event_3(self, data):
+        self._async_route(data["sn"], data)
+
+    @callback
+    def _async_route(self, key: str, data: dict):
+        """Deliver a state change to the entities routed by key, a sn or a light group.
+
+        Each entity only gets the keys in its state_keys, and nothing if the
+        change has none of them.
+        """
+        routes = self._routes.get(key)
+        if not routes:
+            return
+        for entity in routes.values():
+            if entity.entity_id is None:
+                """Not added to Home Assistant yet"""
+                continue
+            keys = data.keys() & entity.state_keys
+            if not keys:
+                continue
+            try:
+                changed = entity.async_discover(data if len(keys) == len(data) else {name: data[name] for name in keys})
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error updating %s with %s", entity.entity_id, data)
+                continue
+            if changed:
+                self._async_schedule_write(entity)
+
+    @callback
+    def _async_schedule_write(self, entity: Entity):
+        """Write the state of a changed entity on the next loop iteration.
+
+        Changes arriving before then, from the same message or the ones
+        handled right behind it, are written together, once per entity.
+        """
+        self._dirty_entities[id(entity)] = entity
+        if not self._write_scheduled:
+            self._write_scheduled = True
+            self.hass.loop.call_soon(self._async_write_dirty_entities)
+
+    @callback
+    def _async_write_dirty_entities(self):
+        self._write_scheduled = False
+        entities = self._dirty_entities
+        self._dirty_entities = {}
+        for entity in entities.values():
+            if entity.hass is None or entity.entity_id is None:
+                continue
+            try:
+                entity.async_write_ha_state()
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error writing the state of %s", entity.entity_id)
+
+    @callback
+    def async_add_route(self, key: str, entity: Entity):
+        """Route the state changes reported for key, a sn or a light group, to the entity"""
+        self._routes.setdefault(key, {})[entity.unique_id] = entity
 
     async def _init_or_update_light_group(self, seq: int, room_id: int, room_name: str, light_group_id: int,
-                                          light_group_name: str, light_group: dict):
+                                          light_group_name: str, light_group: dict,
+                                          sync: _InventorySync | None = None):
         if seq == 1:
             group = {
                 "unique_id": f"{room_id}-{light_group_id}",
@@ -310,9 +542,9 @@ class Gateway:
                 "name": f"{room_name}-{light_group_name}",
             }
             group = dict(light_group, **group)
-            await self._add_entity("light", group)
+            await self._add_entity("light", group, sync)
         else:
-            await self._event_trigger(room_id, light_group_id, light_group)
+            self.ingest.async_put((room_id, light_group_id), light_group, INGEST_BULK)
 
     async def _event_trigger(self, room: int, subgroup: int, device: dict):
         state = {}
@@ -324,30 +556,169 @@ class Gateway:
             state["kelvin"] = int(device["kelvin"])
         if "rgb" in device:
             state["rgb"] = int(device["rgb"])
-        async_dispatcher_send(
-            self.hass, EVENT_ENTITY_STATE_UPDATE.format(f"{room}-{subgroup}"), state
+        self._async_route(f"{room}-{subgroup}", state)
+
+    @callback
+    def _async_schedule_group_sync(self, rooms):
+        """Sync the light groups of the rooms, all rooms if None, once no event came for GROUP_SYNC_DELAY.
+
+        Each call restarts the timer, up to GROUP_SYNC_MAX_DELAY after the
+        first pending room. Rooms added while a sync waits for its response
+        start a new timer.
+        """
+        self._group_sync_rooms.update(self.room_list if rooms is None else rooms)
+        now = self.hass.loop.time()
+        if self._group_sync_unsub is not None:
+            if now - self._group_sync_since >= GROUP_SYNC_MAX_DELAY:
+                return
+            self._group_sync_unsub()
+        else:
+            self._group_sync_since = now
+        self._group_sync_unsub = async_call_later(
+            self.hass, GROUP_SYNC_DELAY, self._async_sync_pending_groups
         )
 
-    async def sync_group_status(self, is_init: bool):
+    async def _async_sync_pending_groups(self, _now=None):
+        self._group_sync_unsub = None
+        rooms = self._group_sync_rooms
+        self._group_sync_rooms = set()
+        await self.sync_group_status(False, rooms)
+
+    async def sync_group_status(self, is_init: bool, rooms=None):
+        """Sync the light groups of the rooms, all rooms of room_list if None"""
+        try:
+            response = await self._async_query_groups(rooms)
+        except asyncio.TimeoutError:
+            _LOGGER.warning("No response to the light group query")
+            return
+        if response is not None:
+            await self._handle_p51(response, 1 if is_init else 2)
+
+    async def _async_query_groups(self, rooms=None):
+        """Query the light groups of the rooms, None if none of them is known.
+
+        Raises asyncio.TimeoutError if the gateway does not answer.
+        """
+        if rooms is not None:
+            rooms = [room for room in self.room_list if room in rooms]
+            if not rooms:
+                return None
         data = []
-        for room in self.room_list:
+        for room in self.room_list if rooms is None else rooms:
             data.append({
                 "id": int(room),
                 "lights": {
                     "subgroups": []
                 }
             })
-        if is_init:
-            await self._async_mqtt_publish("P/0/center/q51", data, 1)
+        return await self.async_request("P/0/center/q51", data)
+
+    async def _add_entity(self, component: str, device: dict, sync: _InventorySync | None = None):
+        """Add child device information.
+
+        The entities of a payload are created once per run. When the payload is
+        reported again the existing entities only get their state updated, and
+        only if the gateway reported something different. A payload renamed in
+        the gateway recreates its entities, their registry entries are kept.
+        """
+        unique_id = device["unique_id"]
+        if sync is not None:
+            sync.synced.add((component, unique_id))
+        entities = self._inventory.setdefault(component, {})
+        previous = entities.get(unique_id)
+        if (component, unique_id) in self.entities:
+            if previous == device:
+                return
+            if previous is not None and any(previous.get(key) != device.get(key) for key in NAME_KEYS):
+                await self._async_recreate_entities(component, unique_id, device)
+            else:
+                self._async_route(device.get("sn", unique_id), device)
         else:
-            await self._async_mqtt_publish("P/0/center/q51", data, 2)
-
-    async def _add_entity(self, component: str, device: dict):
-        """Add child device information"""
+            self.entities[(component, unique_id)] = []
+            """The platforms may change the payload they are given"""
+            async_dispatcher_send(
+                self.hass, EVENT_ENTITY_REGISTER.format(component), dict(device)
+            )
+        entities[unique_id] = dict(device)
+        self._async_save_inventory()
+
+    async def _async_recreate_entities(self, component: str, unique_id: str, device: dict):
+        """Replace the entities of a payload with ones created from its new payload"""
+        for entity in self.entities.get((component, unique_id), ()):
+            self._async_unroute(entity)
+            if entity.hass is not None:
+                await entity.async_remove()
+        self.entities[(component, unique_id)] = []
         async_dispatcher_send(
-            self.hass, EVENT_ENTITY_REGISTER.format(component), device
+            self.hass, EVENT_ENTITY_REGISTER.format(component), dict(device)
         )
 
+    @callback
+    def _async_unroute(self, entity: Entity):
+        for routes in self._routes.values():
+            if routes.get(entity.unique_id) is entity:
+                del routes[entity.unique_id]
+
+    async def async_load_inventory(self):
+        """Create the entities of the last sync right away, before the gateway is reachable"""
+        data = await self._store.async_load()
+        if not data:
+            return
+        self.room_map = {int(room_id): room for room_id, room in data["room_map"].items()}
+        self.room_list = data["room_list"]
+        self.device_map = data["device_map"]
+        self._inventory = data["entities"]
+        for component, entities in self._inventory.items():
+            for unique_id, device in entities.items():
+                if "sn" in device:
+                    self.device_states.setdefault(device["sn"], dict(device))
+                self.entities[(component, unique_id)] = []
+                async_dispatcher_send(
+                    self.hass, EVENT_ENTITY_REGISTER.format(component), dict(device)
+                )
+
+    @callback
+    def async_add_entities(self, component: str, unique_id: str, entities: list[Entity],
+                           async_add_entities: AddEntitiesCallback):
+        """Add the entities a platform created for a payload and keep them for updates and removal"""
+        self.entities.setdefault((component, unique_id), []).extend(entities)
+        async_add_entities(entities)
+
+    def _async_save_inventory(self):
+        self._store.async_delay_save(self._inventory_data, INVENTORY_SAVE_DELAY)
+
+    def _inventory_data(self) -> dict:
+        return {
+            "entities": self._inventory,
+            "room_map": self.room_map,
+            "room_list": self.room_list,
+            "device_map": self.device_map,
+        }
+
+    def _prune_inventory(self, sync: _InventorySync):
+        """Remove the entities the gateway did not report in a complete sync.
+
+        Entities of offline devices are kept, the gateway lists those devices
+        without their entity data.
+        """
+        registry = er.async_get(self.hass)
+        pruned = False
+        for component, entities in self._inventory.items():
+            stale = [
+                unique_id for unique_id, device in entities.items()
+                if (component, unique_id) not in sync.synced and device.get("sn") not in sync.offline_sns
+            ]
+            for unique_id in stale:
+                pruned = True
+                _LOGGER.info("Removing %s %s, the gateway no longer reports it", component, unique_id)
+                del entities[unique_id]
+                for entity in self.entities.pop((component, unique_id), ()):
+                    self._async_unroute(entity)
+                    if entity.entity_id is not None and registry.async_get(entity.entity_id) is not None:
+                        registry.async_remove(entity.entity_id)
+        if pruned:
+            self._async_save_inventory()
+
     async def init(self, entry: ConfigEntry, is_init: bool):
         """Initialize the gateway business logic, including subscribing to device data, scene data, and basic data,
         and sending data reporting instructions to the gateway"""
@@ -363,13 +734,13 @@ class Gateway:
             f"{MQTT_TOPIC_PREFIX}/center/p31",
             # Subscribe to room and light group relationship
             f"{MQTT_TOPIC_PREFIX}/center/p51",
+        ]
+        event_topics = [
             # Subscribe to device property change events
             "p/+/event/3",
             "p/+/event/5",
         ]
 
-        try_connect_times = 3
-
         if self.reconnect_flag:
             await self.reconnect(entry)
             self.reconnect_flag = False
@@ -377,14 +748,9 @@ class Gateway:
         else:
             _LOGGER.warning("没有重新连接mqtt--------------------------------------")
 
-        mqtt_connected = self.hass.data[MQTT_CLIENT_INSTANCE].connected
-        while not mqtt_connected:
-            await asyncio.sleep(1)
-            mqtt_connected = self.hass.data[MQTT_CLIENT_INSTANCE].connected
-            _LOGGER.warning("is_init 1 %s mqtt_connected %s", is_init, mqtt_connected)
-            try_connect_times = try_connect_times - 1
-            if try_connect_times <= 0:
-                break
+        mqtt_connected = await self.hass.data[MQTT_CLIENT_INSTANCE].async_wait_connected(
+            INIT_CONNECT_TIMEOUT
+        )
 
         _LOGGER.warning("is_init 2 %s mqtt_connected %s", is_init, mqtt_connected)
         if mqtt_connected:
@@ -425,40 +791,144 @@ class Gateway:
                             topic,
                             self._async_mqtt_subscribe,
                             0,
-                            "utf-8"
+                            None,
+                            parse_json=True,
                         )
                         for topic in discovery_topics
-                    )
+                    ),
+                    *(
+                        self.hass.data[MQTT_CLIENT_INSTANCE].async_subscribe(
+                            topic,
+                            self._async_ingest_event,
+                            0,
+                            None,
+                            parse_json=True,
+                            dedupe=True,
+                        )
+                        for topic in event_topics
+                    ),
                 )
-                # publish payload to get all basic data Room list, light group list, curtain group list
-                await self._async_mqtt_publish("P/0/center/q33", {})
-                await asyncio.sleep(3)
-                # publish payload to get device list
-                data = {
-                    "start": 0,
-                    "max": DEVICE_COUNT_MAX,
-                    "devTypes": self.devTypes,
-                }
-                await self._async_mqtt_publish("P/0/center/q5", data, 1)
-                await asyncio.sleep(3)
-                # publish payload to get scene list
-                await self._async_mqtt_publish("P/0/center/q28", {})
+                sync = _InventorySync()
+                # Rooms are needed to name scenes and groups, everything else is fetched concurrently
+                await self._async_init_fetch(self._async_fetch_base(), sync)
+                fetches = [
+                    self._async_init_fetch(self._async_fetch_devices(sync), sync),
+                    self._async_init_fetch(self._async_fetch_scenes(sync), sync),
+                ]
                 if self.light_device_type == "group":
-                    # publish payload to get room and light group relationship
-                    await asyncio.sleep(5)
-                    await self._async_mqtt_publish("P/0/center/q31", {})
-                await asyncio.sleep(15)
-                if self.sns:
-                    data = {
-                        "start": 0,
-                        "max": DEVICE_COUNT_MAX,
-                        "sns": self.sns,
-                    }
-                    await self._async_mqtt_publish("P/0/center/q5", data, 2)
+                    fetches.append(self._async_init_fetch(self._async_fetch_groups(sync), sync))
+                await asyncio.gather(*fetches)
+                if sync.complete:
+                    self._prune_inventory(sync)
             except OSError as err:
                 self.init_state = False
                 _LOGGER.error("出了一些问题: %s", err)
 
+    async def _async_init_fetch(self, fetch, sync: _InventorySync):
+        """Run an init fetch, init carries on without its data if the gateway does not answer"""
+        try:
+            await fetch
+        except asyncio.TimeoutError:
+            sync.complete = False
+            _LOGGER.warning("Gateway did not answer during init, continuing without it")
+
+    async def _async_fetch_base(self):
+        """Fetch all basic data Room list, light group list, curtain group list"""
+        self._handle_p33(await self.async_request("P/0/center/q33", {}))
+
+    async def _async_fetch_devices(self, sync: _InventorySync):
+        """Fetch the device list, then the switches whose relays were not listed"""
+        self.sns = []
+        await self._async_fetch_device_pages({"devTypes": self.devTypes}, sync)
+        if self.sns:
+            await self._async_fetch_device_pages({"sns": list(self.sns)}, sync)
+
+    async def _async_fetch_device_pages(self, query: dict, sync: _InventorySync):
+        """Fetch every page of a device list query.
+
+        The first page tells the total, the rest are then requested up to
+        PAGE_WINDOW at a time. The part of a page the gateway left out and
+        pages that timed out are requested again, and devices are deduplicated
+        by sn since the list may shift while it is paged.
+        """
+        seen = set()
+        gaps = deque()
+        attempts = {}
+        inflight = {}
+        cursor = 0
+        total = None
+        try:
+            while True:
+                while len(inflight) < (1 if total is None else PAGE_WINDOW):
+                    if gaps:
+                        start, size = gaps.popleft()
+                    elif total is None and not inflight:
+                        start, size = cursor, self._page_size
+                    elif total is not None and cursor < total:
+                        start, size = cursor, min(self._page_size, total - cursor)
+                    else:
+                        break
+                    cursor = max(cursor, start + size)
+                    task = self.hass.async_create_task(self._async_request_page(query, start, size))
+                    inflight[task] = (start, size)
+                if not inflight:
+                    break
+                done, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    start, size = inflight.pop(task)
+                    try:
+                        page, latency, size_bytes = task.result()
+                    except asyncio.TimeoutError:
+                        attempts[start] = attempts.get(start, 0) + 1
+                        if attempts[start] > PAGE_RETRIES:
+                            raise
+                        gaps.append((start, size))
+                        continue
+                    count = page["count"]
+                    total = page["total"]
+                    if 0 < count < size and start + count < total:
+                        # The gateway caps its pages, ask for the rest again.
+                        self._page_cap = count
+                        gaps.append((start + count, size - count))
+                    self._adapt_page_size(count, latency, size_bytes)
+                    devices = [device for device in page["list"] if device["sn"] not in seen]
+                    seen.update(device["sn"] for device in devices)
+                    await self.report_q5_init(devices, sync)
+        finally:
+            for task in inflight:
+                task.cancel()
+        if total is not None and len(seen) < total:
+            sync.complete = False
+            _LOGGER.warning("Device list incomplete, got %s of %s devices", len(seen), total)
+
+    async def _async_request_page(self, query: dict, start: int, size: int):
+        """Request a device list page, return it with its latency and size in bytes"""
+        data = dict(query, start=start, max=size)
+        sent_at = self.hass.loop.time()
+        msg = await self._async_request("P/0/center/q5", data, REQUEST_TIMEOUT)
+        return msg.parsed_payload["data"], self.hass.loop.time() - sent_at, len(msg.raw_payload)
+
+    def _adapt_page_size(self, count: int, latency: float, size_bytes: int):
+        """Halve the page size after a slow or big page, double it after a fast and small one"""
+        if count == 0:
+            return
+        if latency > PAGE_TARGET_LATENCY or size_bytes > PAGE_TARGET_BYTES:
+            self._page_size = max(PAGE_SIZE_MIN, self._page_size // 2)
+        elif latency < PAGE_TARGET_LATENCY / 2 and size_bytes < PAGE_TARGET_BYTES / 2:
+            self._page_size = self._page_size * 2
+        self._page_size = min(self._page_size, self._page_cap)
+
+    async def _async_fetch_scenes(self, sync: _InventorySync):
+        """Fetch the scene list"""
+        await self._handle_p28(await self.async_request("P/0/center/q28", {}), sync)
+
+    async def _async_fetch_groups(self, sync: _InventorySync):
+        """Fetch room and light group relationship, then register the light groups"""
+        self._handle_p31(await self.async_request("P/0/center/q31", {}))
+        response = await self._async_query_groups()
+        if response is not None:
+            await self._handle_p51(response, 1, sync)
+
     async def _async_mqtt_publish(self, topic: str, data: object, seq=2):
         query_device_payload = {
             "seq": seq,
@@ -467,7 +937,8 @@ class Gateway:
         }
         await self.hass.data[MQTT_CLIENT_INSTANCE].async_publish(
             topic,
-            json.dumps(query_device_payload),
+            codec.dumps(query_device_payload),
             0,
-            False
+            False,
+            priority=PRIORITY_BACKGROUND,
         )
@@ -4,9 +4,9 @@ import asyncio
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.const import CONF_NAME
-from .Gateway import Gateway
+from .Gateway import Gateway, inventory_store
 from .const import PLATFORMS, MQTT_CLIENT_INSTANCE, CONF_LIGHT_DEVICE_TYPE, DOMAIN, FLAG_IS_INITIALIZED, \
-    CACHE_ENTITY_STATE_UPDATE_KEY_DICT, CONF_BROKER
+    CONF_BROKER
 from .mdns import MdnsScanner
 
 _LOGGER = logging.getLogger(__name__)
@@ -19,6 +19,10 @@ async def _async_config_entry_updated(hass: HomeAssistant, entry: ConfigEntry) -
     - entry: ConfigEntry对象，表示配置项。
     """
     hub = hass.data[DOMAIN][entry.entry_id]
+    # MQTT 客户端参数只在创建时读取，选项变化时重新加载
+    if dict(entry.options) != hub.options:
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
     hass.async_create_task(
         hub.init(entry, False)
     )
@@ -35,9 +39,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hub = Gateway(hass, entry)
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = hub
 
-    # 初始化标记和实体状态更新键字典
+    # 初始化标记
     hass.data.setdefault(FLAG_IS_INITIALIZED, False)
-    hass.data.setdefault(CACHE_ENTITY_STATE_UPDATE_KEY_DICT, {})
 
     # 如果尚未初始化，则进行初始化操作
     if not hass.data[FLAG_IS_INITIALIZED]:
@@ -46,6 +49,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     else:
         await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    # 用上次同步的设备清单立即创建实体
+    await hub.async_load_inventory()
+
     # 启用重连标志
     hub.reconnect_flag = True
 
@@ -157,6 +163,12 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     await hub.disconnect()
 
-    hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT] = {}
+    return True
 
-    return True
\ No newline at end of file
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """删除配置项时清理其设备清单存储。
+    参数:
+    - hass: HomeAssistant对象，表示Home Assistant实例。
+    - entry: ConfigEntry对象，表示配置项。
+    """
+    await inventory_store(hass, entry.entry_id).async_remove()
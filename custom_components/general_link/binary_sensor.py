@@ -6,7 +6,8 @@ from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN, EVENT_ENTITY_REGISTER, EVENT_ENTITY_STATE_UPDATE, CACHE_ENTITY_STATE_UPDATE_KEY_DICT, MANUFACTURER
+from .const import DOMAIN, EVENT_ENTITY_REGISTER, MANUFACTURER
+from .entity import StateSnapshotMixin
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,10 +20,13 @@ async def async_setup_entry(
 ) -> None:
     """根据配置入口设置二进制传感器实体"""
 
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
     async def async_discover(config_payload):
+        unique_id = config_payload["unique_id"]
         try:
             if "a15" in config_payload:
-                async_add_entities([MotionSensor(hass, config_payload, config_entry)])
+                hub.async_add_entities(COMPONENT, unique_id, [MotionSensor(hass, config_payload, config_entry)], async_add_entities)
         except Exception as e:
             _LOGGER.error(f"发现传感器时出错: {e}")
 
@@ -33,11 +37,12 @@ async def async_setup_entry(
     config_entry.async_on_unload(unsub)
 
 
-class MotionSensor(BinarySensorEntity):
+class MotionSensor(StateSnapshotMixin, BinarySensorEntity):
     """用于处理占用传感器相关的业务逻辑的自定义实体类"""
 
     should_poll = False
     device_class = BinarySensorDeviceClass.MOTION
+    state_keys = frozenset({"a15"})
     def __init__(self, hass: HomeAssistant, config: dict, config_entry: ConfigEntry) -> None:
         self._attr_unique_id = config["unique_id"] + "M"
         self._attr_name = config["name"] + "_存在"
@@ -49,21 +54,16 @@ class MotionSensor(BinarySensorEntity):
         self.config_entry = config_entry
         self.update_state(config)
 
-        key = EVENT_ENTITY_STATE_UPDATE.format(self.unique_id)
-        if key not in hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT]:
-            unsub = async_dispatcher_connect(
-                hass, key, self.async_discover
-            )
-            hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT][key] = unsub
-            config_entry.async_on_unload(unsub)
+        """Receive the state changes of the device through the gateway's routing table"""
+        hass.data[DOMAIN][config_entry.entry_id].async_add_route(config["unique_id"], self)
 
     @callback
-    def async_discover(self, data: dict) -> None:
+    def async_discover(self, data: dict) -> bool:
         try:
-            self.update_state(data)
-            self.async_write_ha_state()
+            return super().async_discover(data)
         except Exception as e:
             _LOGGER.error(f"更新传感器状态时出错: {e}")
+            return False
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -74,6 +74,9 @@ class MotionSensor(BinarySensorEntity):
             "manufacturer": MANUFACTURER,
         }
 
+    def _state_snapshot(self) -> tuple:
+        return (self._attr_is_on,)
+
     def update_state(self, data: dict):
         """传感器事件报告更改HA中的传感器状态"""
         if "a15" in data:
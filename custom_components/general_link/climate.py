@@ -1,7 +1,6 @@
 """Business logic for climate entity."""
 from __future__ import annotations
 
-import json
 import logging
 from abc import ABC
 
@@ -10,13 +9,15 @@ from homeassistant.components.climate import ClimateEntity, HVACMode, ClimateEnt
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import UnitOfTemperature, PRECISION_WHOLE
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN, MQTT_CLIENT_INSTANCE, EVENT_ENTITY_STATE_UPDATE, CACHE_ENTITY_STATE_UPDATE_KEY_DICT, \
+from . import codec
+from .const import DOMAIN, MQTT_CLIENT_INSTANCE, \
     EVENT_ENTITY_REGISTER, MANUFACTURER
+from .entity import StateSnapshotMixin
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,16 +32,19 @@ async def async_setup_entry(
     """This method is executed after the integration is initialized to create an event listener,
     which is used to create a sub-device"""
 
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
     async def async_discover(config_payload):
+        unique_id = config_payload["unique_id"]
         try:
             if "a110" in config_payload:
                 a110 = int(config_payload["a110"])
                 if a110 == 2:
                  # config_tmp = config_payload
                   #config_tmp["name"] = config_payload["name"] + "_水机"
-                  async_add_entities([CustomClimateW(hass, config_payload, config_entry)])
+                  hub.async_add_entities(COMPONENT, unique_id, [CustomClimateW(hass, config_payload, config_entry)], async_add_entities)
             else:
-                async_add_entities([CustomClimate(hass, config_payload, config_entry)])
+                hub.async_add_entities(COMPONENT, unique_id, [CustomClimate(hass, config_payload, config_entry)], async_add_entities)
 
             if "a111" in config_payload:
                 a111 = int(config_payload["a111"])
@@ -48,7 +52,7 @@ async def async_setup_entry(
                    #config_tmp = config_payload
                   # config_tmp["name"] = config_payload["name"] + "_地暖"
                    #config_tmp["unique_id"] = config_payload["unique_id"] + "H"
-                   async_add_entities([CustomClimateH(hass, config_payload, config_entry)])
+                   hub.async_add_entities(COMPONENT, unique_id, [CustomClimateH(hass, config_payload, config_entry)], async_add_entities)
 
         except Exception:
             raise
@@ -60,11 +64,14 @@ async def async_setup_entry(
     config_entry.async_on_unload(unsub)
 
 
-class CustomClimate(ClimateEntity, ABC):
+class CustomClimate(StateSnapshotMixin, ClimateEntity, ABC):
     """Custom entity class to handle business logic related to climates"""
 
     should_poll = False
 
+    """State keys of the device this entity is updated from"""
+    state_keys = frozenset({"a64", "a65", "a66", "a67", "a19", "a20"})
+
     device_class = COMPONENT
 
     _attr_supported_features = ClimateEntityFeature.TARGET_TEMPERATURE | ClimateEntityFeature.FAN_MODE
@@ -111,23 +118,8 @@ class CustomClimate(ClimateEntity, ABC):
 
         self.update_state(config)
 
-        """Add a device state change event listener, and execute the specified method when the device state changes. 
-        Note: It is necessary to determine whether an event listener has been added here to avoid repeated additions."""
-        key = EVENT_ENTITY_STATE_UPDATE.format(self.unique_id)
-        if key not in hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT]:
-            unsub = async_dispatcher_connect(
-                hass, key, self.async_discover
-            )
-            hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT][key] = unsub
-            config_entry.async_on_unload(unsub)
-
-    @callback
-    def async_discover(self, data: dict) -> None:
-        try:
-            self.update_state(data)
-            self.async_write_ha_state()
-        except Exception:
-            raise
+        """Receive the state changes of the device through the gateway's routing table"""
+        hass.data[DOMAIN][config_entry.entry_id].async_add_route(config["unique_id"], self)
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -139,6 +131,9 @@ class CustomClimate(ClimateEntity, ABC):
             "manufacturer": MANUFACTURER,
         }
 
+    def _state_snapshot(self) -> tuple:
+        return (self._attr_hvac_mode, self._attr_target_temperature, self._attr_current_temperature, self._attr_current_humidity, self._attr_fan_mode)
+
     def update_state(self, data):
         #_LOGGER.warning("update_state : %s", data)
 
@@ -260,18 +255,22 @@ class CustomClimate(ClimateEntity, ABC):
             }
         }
 
-        await self.hass.data[MQTT_CLIENT_INSTANCE].async_publish(
+        """Only target temperature changes are coalesced"""
+        await self.hass.data[MQTT_CLIENT_INSTANCE].async_send_command(
+            self.sn,
             "P/0/center/q74",
-            json.dumps(message),
-            0,
-            False
+            codec.dumps(message),
+            "a65" if i == 20 else None
         )
 
-class CustomClimateH(ClimateEntity, ABC):
+class CustomClimateH(StateSnapshotMixin, ClimateEntity, ABC):
     """Custom entity class to handle business logic related to climates"""
 
     should_poll = False
 
+    """State keys of the device this entity is updated from"""
+    state_keys = frozenset({"a113", "a114", "a109", "a19", "a20"})
+
     device_class = COMPONENT
 
     _attr_supported_features = ClimateEntityFeature.TARGET_TEMPERATURE
@@ -321,23 +320,8 @@ class CustomClimateH(ClimateEntity, ABC):
 
         self.update_state(config)
 
-        """Add a device state change event listener, and execute the specified method when the device state changes. 
-        Note: It is necessary to determine whether an event listener has been added here to avoid repeated additions."""
-        key = EVENT_ENTITY_STATE_UPDATE.format(self.unique_id)
-        if key not in hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT]:
-            unsub = async_dispatcher_connect(
-                hass, key, self.async_discover
-            )
-            hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT][key] = unsub
-            config_entry.async_on_unload(unsub)
-
-    @callback
-    def async_discover(self, data: dict) -> None:
-        try:
-            self.update_state(data)
-            self.async_write_ha_state()
-        except Exception:
-            raise
+        """Receive the state changes of the device through the gateway's routing table"""
+        hass.data[DOMAIN][config_entry.entry_id].async_add_route(config["unique_id"], self)
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -349,6 +333,9 @@ class CustomClimateH(ClimateEntity, ABC):
             "manufacturer": MANUFACTURER,
         }
 
+    def _state_snapshot(self) -> tuple:
+        return (self._attr_hvac_mode, self._attr_target_temperature, self._attr_current_temperature, self._attr_current_humidity)
+
     def update_state(self, data):
         #_LOGGER.warning("update_stateh : %s", data)
 
@@ -427,15 +414,18 @@ class CustomClimateH(ClimateEntity, ABC):
             }
         }
 
-        await self.hass.data[MQTT_CLIENT_INSTANCE].async_publish(
+        """Only target temperature changes are coalesced"""
+        await self.hass.data[MQTT_CLIENT_INSTANCE].async_send_command(
+            self.sn,
             "P/0/center/q74",
-            json.dumps(message),
-            0,
-            False
+            codec.dumps(message),
+            m if i == 34 else None
         )
 
 class CustomClimateW(CustomClimate):
 
+    state_keys = frozenset({"a64", "a65", "a66", "a67", "a19", "a20", "a109"})
+
     def __init__(self, hass: HomeAssistant, config: dict, config_entry: ConfigEntry) -> None:
         super().__init__(hass, config , config_entry)
 
@@ -589,9 +579,10 @@ class CustomClimateW(CustomClimate):
                  }
              }
 
-         await self.hass.data[MQTT_CLIENT_INSTANCE].async_publish(
+         """Only target temperature changes are coalesced"""
+         await self.hass.data[MQTT_CLIENT_INSTANCE].async_send_command(
+             self.sn,
              "P/0/center/q74",
-             json.dumps(message),
-             0,
-             False
+             codec.dumps(message),
+             "a65" if i == 20 else None
          )
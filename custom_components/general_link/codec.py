@@ -0,0 +1,27 @@
+"""JSON encoding and decoding of MQTT payloads."""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Both decoders raise a ValueError subclass on invalid JSON.
+if orjson is not None:
+
+    def dumps(obj: Any) -> bytes:
+        """Encode an object to compact JSON bytes."""
+        return orjson.dumps(obj)
+
+    loads = orjson.loads
+
+else:
+
+    def dumps(obj: Any) -> bytes:
+        """Encode an object to compact JSON bytes."""
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    loads = json.loads
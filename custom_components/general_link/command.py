@@ -0,0 +1,172 @@
+"""Outbound command handling in front of the MQTT client."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_COALESCE_WINDOW = 0.3
+
+CommandPublisher = Callable[[str, str, Any], Awaitable[None]]
+
+
+class CommandScheduler:
+    """Run commands in order per device and concurrently across devices.
+
+    Each target (device sn, or room-subgroup for light groups) gets its own
+    queue, drained by a task that only exists while the queue is not empty.
+    A command is published once the previous command for the same target has
+    been acknowledged, while commands for other targets proceed in parallel.
+    """
+
+    def __init__(
+            self, hass: HomeAssistant, publish: Callable[[str, Any], Awaitable[None]]
+    ) -> None:
+        self.hass = hass
+        self._publish = publish
+        self._shards: dict[str, deque[tuple[str, Any, asyncio.Future[None]]]] = {}
+
+    @property
+    def active_shards(self) -> int:
+        """Return the number of targets with queued commands."""
+        return len(self._shards)
+
+    async def async_send(self, target: str, topic: str, payload: Any) -> None:
+        """Queue a command behind the earlier ones for its target."""
+        future: asyncio.Future[None] = self.hass.loop.create_future()
+        if (shard := self._shards.get(target)) is None:
+            shard = self._shards[target] = deque()
+            self.hass.async_create_task(self._async_run_shard(target, shard))
+        shard.append((topic, payload, future))
+        await future
+
+    async def _async_run_shard(
+            self, target: str, shard: deque[tuple[str, Any, asyncio.Future[None]]]
+    ) -> None:
+        try:
+            while shard:
+                topic, payload, future = shard.popleft()
+                if future.cancelled():
+                    continue
+                try:
+                    await self._publish(topic, payload)
+                except Exception as err:  # pylint: disable=broad-except
+                    if not future.done():
+                        future.set_exception(err)
+                else:
+                    if not future.done():
+                        future.set_result(None)
+        finally:
+            del self._shards[target]
+
+
+class _PendingCommand:
+    """Latest value waiting for the end of its coalescing window."""
+
+    __slots__ = ("topic", "payload", "future", "timer")
+
+    def __init__(
+            self,
+            topic: str,
+            payload: Any,
+            future: asyncio.Future[None],
+            timer: asyncio.TimerHandle,
+    ) -> None:
+        self.topic = topic
+        self.payload = payload
+        self.future = future
+        self.timer = timer
+
+
+class CommandCoalescer:
+    """Send only the latest value of rapidly repeated commands.
+
+    Commands are keyed by target (device sn, or room-subgroup for light groups)
+    and attribute. The first command for a key is sent at once; commands for
+    the same key within the window replace each other and only the last one is
+    sent when the window ends. Commands without an attribute are never
+    coalesced, they first flush whatever is still pending for their target so
+    the order seen by the device is kept.
+    """
+
+    def __init__(
+            self,
+            hass: HomeAssistant,
+            publish: CommandPublisher,
+            window: float = DEFAULT_COALESCE_WINDOW,
+    ) -> None:
+        self.hass = hass
+        self._publish = publish
+        self._window = window
+        self._pending: dict[tuple[str, str], _PendingCommand] = {}
+        self._last_sent: dict[tuple[str, str], float] = {}
+        self.superseded = 0
+
+    async def async_send(
+            self, target: str, topic: str, payload: Any, attribute: str | None = None
+    ) -> None:
+        """Send a command, coalescing it with others for the same attribute."""
+        if attribute is None:
+            await self._async_flush_target(target)
+            await self._publish(target, topic, payload)
+            return
+
+        key = (target, attribute)
+        if (pending := self._pending.get(key)) is not None:
+            pending.topic = topic
+            pending.payload = payload
+            self.superseded += 1
+            await asyncio.shield(pending.future)
+            return
+
+        loop = self.hass.loop
+        now = loop.time()
+        send_at = self._last_sent.get(key, -math.inf) + self._window
+        if send_at <= now:
+            self._last_sent[key] = now
+            await self._publish(target, topic, payload)
+            return
+
+        pending = _PendingCommand(
+            topic,
+            payload,
+            loop.create_future(),
+            loop.call_at(send_at, self._async_flush, key),
+        )
+        self._pending[key] = pending
+        await asyncio.shield(pending.future)
+
+    async def _async_flush_target(self, target: str) -> None:
+        """Send all commands still pending for a target now."""
+        futures = [
+            self._async_flush(key)
+            for key in [key for key in self._pending if key[0] == target]
+        ]
+        if futures:
+            await asyncio.gather(*futures, return_exceptions=True)
+
+    @callback
+    def _async_flush(self, key: tuple[str, str]) -> asyncio.Future[None]:
+        """Send the latest pending value for a key."""
+        pending = self._pending.pop(key)
+        pending.timer.cancel()
+        self._last_sent[key] = self.hass.loop.time()
+        self.hass.async_create_task(self._async_publish_pending(key[0], pending))
+        return pending.future
+
+    async def _async_publish_pending(self, target: str, pending: _PendingCommand) -> None:
+        try:
+            await self._publish(target, pending.topic, pending.payload)
+        except Exception as err:  # pylint: disable=broad-except
+            if not pending.future.done():
+                pending.future.set_exception(err)
+        else:
+            if not pending.future.done():
+                pending.future.set_result(None)
@@ -8,6 +8,7 @@ import voluptuous as vol
 
 from homeassistant import config_entries, exceptions
 from homeassistant.components import zeroconf
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.const import (
     CONF_NAME,
@@ -16,9 +17,12 @@ from homeassistant.const import (
     CONF_USERNAME,
 )
 
+from .command import DEFAULT_COALESCE_WINDOW
 from .const import (
     DOMAIN, CONF_BROKER, CONF_LIGHT_DEVICE_TYPE
 )
+from .mqtt import CONF_MAX_INFLIGHT, CONF_TRANSPORT, CONF_COALESCE_WINDOW, DEFAULT_MAX_INFLIGHT, \
+    TRANSPORT_THREAD, TRANSPORT_ASYNCIO
 from .scan import scan_and_get_connection_dict
 from .util import format_connection
 
@@ -33,6 +37,12 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> OptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
     async def async_step_zeroconf(
             self, discovery_info: zeroconf.ZeroconfServiceInfo
     ) -> FlowResult:
@@ -161,6 +171,32 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
 
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Tune the MQTT client, kept apart from the connection data mDNS rewrites"""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Configure the publish window, the socket transport and the command coalescing"""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        fields = OrderedDict()
+        fields[vol.Required(
+            CONF_MAX_INFLIGHT, default=options.get(CONF_MAX_INFLIGHT, DEFAULT_MAX_INFLIGHT)
+        )] = vol.All(vol.Coerce(int), vol.Range(min=1, max=100))
+        fields[vol.Required(
+            CONF_TRANSPORT, default=options.get(CONF_TRANSPORT, TRANSPORT_THREAD)
+        )] = vol.In([TRANSPORT_THREAD, TRANSPORT_ASYNCIO])
+        fields[vol.Required(
+            CONF_COALESCE_WINDOW, default=options.get(CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW)
+        )] = vol.All(vol.Coerce(float), vol.Range(min=0, max=5))
+
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(fields))
+
+
 def try_connection(hass, broker, port, username, password, protocol="3.1.1"):
     return True
 
@@ -10,10 +10,6 @@ CONF_LIGHT_DEVICE_TYPE = "light_device_type"
 
 FLAG_IS_INITIALIZED = "flag_is_initialized"
 
-CACHE_ENTITY_STATE_UPDATE_KEY_DICT = "general_link_entity_state_update_dict"
-
-EVENT_ENTITY_STATE_UPDATE = "general_link_entity_state_update_{}"
-
 EVENT_ENTITY_REGISTER = "general_link_entity_register_{}"
 
 MQTT_CLIENT_INSTANCE = "mqtt_client_instance"
@@ -1,7 +1,6 @@
 """Business logic for cover entity."""
 from __future__ import annotations
 
-import json
 import logging
 from typing import Any
 
@@ -13,13 +12,15 @@ from homeassistant.components.cover import (
     CoverDeviceClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN, MQTT_CLIENT_INSTANCE, EVENT_ENTITY_STATE_UPDATE, CACHE_ENTITY_STATE_UPDATE_KEY_DICT, \
+from . import codec
+from .const import DOMAIN, MQTT_CLIENT_INSTANCE, \
     EVENT_ENTITY_REGISTER, MANUFACTURER
+from .entity import StateSnapshotMixin
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,13 +35,16 @@ async def async_setup_entry(
     """This method is executed after the integration is initialized to create an event listener,
     which is used to create a sub-device"""
 
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
     async def async_discover(config_payload):
+        unique_id = config_payload["unique_id"]
 
         try:
             if config_payload["openWay"] <= 4:
-               async_add_entities([CustomCover(hass, config_payload, config_entry)])
+               hub.async_add_entities(COMPONENT, unique_id, [CustomCover(hass, config_payload, config_entry)], async_add_entities)
             else:
-               async_add_entities([CustomCoverA(hass, config_payload, config_entry)])
+               hub.async_add_entities(COMPONENT, unique_id, [CustomCoverA(hass, config_payload, config_entry)], async_add_entities)
 
         except Exception:
             raise
@@ -52,9 +56,12 @@ async def async_setup_entry(
     config_entry.async_on_unload(unsub)
 
 
-class CustomCover(CoverEntity):
+class CustomCover(StateSnapshotMixin, CoverEntity):
     """Custom entity class to handle business logic related to curtains"""
 
+    """State keys of the device this entity is updated from"""
+    state_keys = frozenset({"travel"})
+
     def close_cover(self, **kwargs: Any) -> None:
         pass
 
@@ -92,23 +99,8 @@ class CustomCover(CoverEntity):
 
         self.update_state(config)
 
-        """Add a device state change event listener, and execute the specified method when the device state changes. 
-        Note: It is necessary to determine whether an event listener has been added here to avoid repeated additions."""
-        key = EVENT_ENTITY_STATE_UPDATE.format(self.unique_id)
-        if key not in hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT]:
-            unsub = async_dispatcher_connect(
-                hass, key, self.async_discover
-            )
-            hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT][key] = unsub
-            config_entry.async_on_unload(unsub)
-
-    @callback
-    def async_discover(self, data: dict) -> None:
-        try:
-            self.update_state(data)
-            self.async_write_ha_state()
-        except Exception:
-            raise
+        """Receive the state changes of the device through the gateway's routing table"""
+        hass.data[DOMAIN][config_entry.entry_id].async_add_route(config["unique_id"], self)
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -150,6 +142,9 @@ class CustomCover(CoverEntity):
         """Return position for roller."""
         return self._current_position
 
+    def _state_snapshot(self) -> tuple:
+        return (self._current_position,)
+
     def update_state(self, data):
         if "travel" in data:
             position = int(data["travel"] * 100)
@@ -200,15 +195,17 @@ class CustomCover(CoverEntity):
         if action == 3:
             message["data"]["travel"] = round(position / 100, 2)
 
-        await self.hass.data[MQTT_CLIENT_INSTANCE].async_publish(
+        await self.hass.data[MQTT_CLIENT_INSTANCE].async_send_command(
+            self.sn,
             "P/0/center/q21",
-            json.dumps(message),
-            0,
-            False
+            codec.dumps(message),
+            "travel" if action == 3 else None
         )
 
 class CustomCoverA(CustomCover):
     """Custom entity class to handle business logic related to curtains"""
+    state_keys = frozenset({"travel", "a108"})
+
     supported_features = CoverEntityFeature.SET_POSITION | CoverEntityFeature.OPEN | CoverEntityFeature.CLOSE | CoverEntityFeature.STOP | CoverEntityFeature.SET_TILT_POSITION
 
     device_class = CoverDeviceClass.CURTAIN
@@ -226,6 +223,9 @@ class CustomCoverA(CustomCover):
         await self.set_tilt_position(kwargs[ATTR_TILT_POSITION])
         await self.exec_command(11, tilt_position)
 
+    def _state_snapshot(self) -> tuple:
+        return (self._current_position, self._current_tilt_position)
+
     def update_state(self, data):
         if "travel" in data:
             position = int(data["travel"] * 100)
@@ -274,9 +274,15 @@ class CustomCoverA(CustomCover):
         if action == 11:
             message["data"]["angle"] = round(position / 100, 2)
 
-        await self.hass.data[MQTT_CLIENT_INSTANCE].async_publish(
+        attribute = None
+        if action == 3:
+            attribute = "travel"
+        elif action == 11:
+            attribute = "angle"
+
+        await self.hass.data[MQTT_CLIENT_INSTANCE].async_send_command(
+            self.sn,
             "P/0/center/q21",
-            json.dumps(message),
-            0,
-            False
+            codec.dumps(message),
+            attribute
         )
@@ -0,0 +1,19 @@
+"""Diagnostics support for GeneralLink."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, MQTT_CLIENT_INSTANCE
+
+
+async def async_get_config_entry_diagnostics(
+        hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    return {
+        "mqtt": hass.data[MQTT_CLIENT_INSTANCE].diagnostics(),
+        "ingest": hass.data[DOMAIN][entry.entry_id].ingest.as_dict(),
+    }
@@ -0,0 +1,25 @@
+"""Shared behaviour of the entities updated through the gateway's routing table."""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+
+from homeassistant.core import callback
+
+
+class StateSnapshotMixin(ABC):
+    """Report whether a routed state change altered what Home Assistant shows.
+
+    Entities apply a change in their ``update_state`` and define
+    ``_state_snapshot``. The gateway only writes the state of entities whose
+    snapshot changed.
+    """
+
+    @abstractmethod
+    def _state_snapshot(self) -> tuple:
+        """The attributes the state shown in Home Assistant is written from."""
+
+    @callback
+    def async_discover(self, data: dict) -> bool:
+        before = self._state_snapshot()
+        self.update_state(data)
+        return self._state_snapshot() != before
@@ -1,20 +1,21 @@
 """Business logic for fan entity."""
 from __future__ import annotations
 import math
-import json
 import logging
 from typing import Any, Optional
 from abc import ABC
 from homeassistant.components.fan import FanEntity,FanEntityFeature
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.util.percentage import ranged_value_to_percentage, percentage_to_ranged_value
 
+from . import codec
 from .const import DOMAIN, MQTT_CLIENT_INSTANCE, \
-    EVENT_ENTITY_REGISTER, EVENT_ENTITY_STATE_UPDATE, CACHE_ENTITY_STATE_UPDATE_KEY_DICT, MANUFACTURER
+    EVENT_ENTITY_REGISTER, MANUFACTURER
+from .entity import StateSnapshotMixin
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,12 +30,15 @@ async def async_setup_entry(
     """This method is executed after the integration is initialized to create an event listener,
     which is used to create a sub-device"""
 
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
     async def async_discover(config_payload):
+        unique_id = config_payload["unique_id"]
         try:
             if "a112" in config_payload:
                 a112 = int(config_payload["a112"])
                 if a112 == 1:
-                  async_add_entities([CustomFan(hass, config_payload, config_entry)])
+                  hub.async_add_entities(COMPONENT, unique_id, [CustomFan(hass, config_payload, config_entry)], async_add_entities)
         except Exception:
             raise
 
@@ -45,11 +49,14 @@ async def async_setup_entry(
     config_entry.async_on_unload(unsub)
 
 
-class CustomFan(FanEntity, ABC):
+class CustomFan(StateSnapshotMixin, FanEntity, ABC):
     """Custom entity class to handle business logic related to fan"""
 
     should_poll = False
 
+    """State keys of the device this entity is updated from"""
+    state_keys = frozenset({"a115", "a116", "a109"})
+
     device_class = COMPONENT
 
     supported_features =  FanEntityFeature.PRESET_MODE | FanEntityFeature.SET_SPEED
@@ -89,26 +96,11 @@ class CustomFan(FanEntity, ABC):
 
         self.update_state(config)
 
-        """Add a device state change event listener, and execute the specified method when the device state changes. 
-        Note: It is necessary to determine whether an event listener has been added here to avoid repeated additions."""
-        key = EVENT_ENTITY_STATE_UPDATE.format(self.unique_id)
-        if key not in hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT]:
-            unsub = async_dispatcher_connect(
-                hass, key, self.async_discover
-            )
-            hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT][key] = unsub
-            config_entry.async_on_unload(unsub)
+        """Receive the state changes of the device through the gateway's routing table"""
+        hass.data[DOMAIN][config_entry.entry_id].async_add_route(config["unique_id"], self)
 
 
 
-    @callback
-    def async_discover(self, data: dict) -> None:
-        try:
-            self.update_state(data)
-            self.async_write_ha_state()
-        except Exception:
-            raise
-
     @property
     def device_info(self) -> DeviceInfo:
         """Information about this entity/device."""
@@ -124,6 +116,9 @@ class CustomFan(FanEntity, ABC):
         """Return true if fan is on."""
         return self._is_on
 
+    def _state_snapshot(self) -> tuple:
+        return (self._is_on, self._attr_preset_mode, self._attr_percentage)
+
     def update_state(self, data):
         """fan event reporting changes the fan state in HA"""
         if "a115" in data:
@@ -220,9 +215,9 @@ class CustomFan(FanEntity, ABC):
             }
         }
 
-        await self.hass.data[MQTT_CLIENT_INSTANCE].async_publish(
+        await self.hass.data[MQTT_CLIENT_INSTANCE].async_send_command(
+            self.sn,
             "P/0/center/q74",
-            json.dumps(message),
-            0,
-            False
+            codec.dumps(message),
+            m if i == 36 else None
         )
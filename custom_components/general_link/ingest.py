@@ -0,0 +1,155 @@
+"""Inbound state change handling between the MQTT client and the gateway."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_PENDING = 2000
+DEFAULT_BATCH_SIZE = 200
+
+# Classes of changes, processed in this order: changes automations react to
+# (motion, relay presses), other state changes, then device lists and energy
+# telemetry.
+INGEST_CRITICAL = 0
+INGEST_NORMAL = 1
+INGEST_BULK = 2
+INGEST_CLASSES = ("critical", "normal", "bulk")
+
+ChangeProcessor = Callable[[list[tuple[Hashable, dict[str, Any], int]]], Awaitable[None]]
+
+
+class IngestQueue:
+    """Bounded queue of state changes keeping one merged change per key.
+
+    Keys are device sns or light groups. A change for a key that is still
+    queued is merged into the queued one, so a device updated many times while
+    Home Assistant was busy is processed once, with its latest state. When more
+    than ``max_pending`` keys are queued the oldest one of the least urgent
+    class, other than the key being queued, is shed and handed to ``shed``
+    with its class, whose owner may fetch the current state instead.
+
+    Each class has its own lane and the lanes are processed in class order, a
+    merged change moves to the most urgent class of its parts. The changes are
+    processed in batches by a task that only exists while the queue is not
+    empty.
+    """
+
+    def __init__(
+            self,
+            hass: HomeAssistant,
+            process: ChangeProcessor,
+            shed: Callable[[Hashable, int], None],
+            max_pending: int = DEFAULT_MAX_PENDING,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.hass = hass
+        self._process = process
+        self._shed = shed
+        self.max_pending = max_pending
+        self._batch_size = batch_size
+        self._lanes: tuple[OrderedDict[Hashable, tuple[dict[str, Any], float]], ...] = tuple(
+            OrderedDict() for _ in INGEST_CLASSES
+        )
+        self._lane_of: dict[Hashable, int] = {}
+        self._task: asyncio.Task[None] | None = None
+        self.received = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.processed = 0
+        self.max_depth = 0
+        self.class_metrics = [
+            {"received": 0, "processed": 0, "last_delay": 0.0, "max_delay": 0.0}
+            for _ in INGEST_CLASSES
+        ]
+
+    @callback
+    def async_put(
+            self, key: Hashable, change: dict[str, Any], priority: int = INGEST_NORMAL
+    ) -> None:
+        """Queue a change, merging it into the one still queued for its key."""
+        self.received += 1
+        self.class_metrics[priority]["received"] += 1
+        now = self.hass.loop.time()
+        if (lane := self._lane_of.get(key)) is not None:
+            pending, queued_at = self._lanes[lane][key]
+            pending.update(change)
+            self.conflated += 1
+            if priority < lane:
+                del self._lanes[lane][key]
+                self._lanes[priority][key] = (pending, now)
+                self._lane_of[key] = priority
+            return
+        self._lanes[priority][key] = (dict(change), now)
+        self._lane_of[key] = priority
+        if len(self._lane_of) > self.max_pending:
+            self._shed_oldest(key)
+        self.max_depth = max(self.max_depth, len(self._lane_of))
+        if self._task is None:
+            self._task = self.hass.async_create_task(self._async_run())
+
+    def _shed_oldest(self, keep: Hashable) -> None:
+        """Drop the oldest change of the least urgent class, never the one of keep."""
+        for priority in reversed(range(len(self._lanes))):
+            lane = self._lanes[priority]
+            # keep was queued last, if it is the oldest it is alone in its lane.
+            shed_key = next(iter(lane), keep)
+            if shed_key != keep:
+                break
+        else:
+            return
+        del lane[shed_key]
+        del self._lane_of[shed_key]
+        self.dropped += 1
+        self._shed(shed_key, priority)
+
+    async def _async_run(self) -> None:
+        try:
+            while self._lane_of:
+                now = self.hass.loop.time()
+                batch = []
+                for priority, lane in enumerate(self._lanes):
+                    if not lane or len(batch) >= self._batch_size:
+                        continue
+                    oldest = now
+                    taken = len(batch)
+                    while lane and len(batch) < self._batch_size:
+                        key, (change, queued_at) = lane.popitem(last=False)
+                        del self._lane_of[key]
+                        oldest = min(oldest, queued_at)
+                        batch.append((key, change, priority))
+                    metrics = self.class_metrics[priority]
+                    metrics["processed"] += len(batch) - taken
+                    metrics["last_delay"] = now - oldest
+                    metrics["max_delay"] = max(metrics["max_delay"], now - oldest)
+                try:
+                    await self._process(batch)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("Error processing %s state changes", len(batch))
+                self.processed += len(batch)
+                # Let the loop breathe between batches.
+                await asyncio.sleep(0)
+        finally:
+            self._task = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the queue state for diagnostics."""
+        return {
+            "depth": len(self._lane_of),
+            "max_depth": self.max_depth,
+            "max_pending": self.max_pending,
+            "received": self.received,
+            "conflated": self.conflated,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "classes": {
+                name: dict(metrics, depth=len(lane))
+                for name, metrics, lane in zip(INGEST_CLASSES, self.class_metrics, self._lanes)
+            },
+        }
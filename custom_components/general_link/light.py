@@ -1,19 +1,20 @@
 """Business logic for light entity."""
 from __future__ import annotations
 
-import json
 import logging
 from typing import Any
 
 from homeassistant.components.light import LightEntity, ColorMode
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from . import codec
 from .const import DOMAIN, MQTT_CLIENT_INSTANCE, \
-    EVENT_ENTITY_REGISTER, EVENT_ENTITY_STATE_UPDATE, CACHE_ENTITY_STATE_UPDATE_KEY_DICT, MANUFACTURER
+    EVENT_ENTITY_REGISTER, MANUFACTURER
+from .entity import StateSnapshotMixin
 from .util import color_temp_to_rgb
 
 _LOGGER = logging.getLogger(__name__)
@@ -37,9 +38,12 @@ async def async_setup_entry(
     """This method is executed after the integration is initialized to create an event listener,
     which is used to create a sub-device"""
 
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
     async def async_discover(config_payload):
+        unique_id = config_payload["unique_id"]
         try:
-            async_add_entities([CustomLight(hass, config_payload, config_entry)])
+            hub.async_add_entities(COMPONENT, unique_id, [CustomLight(hass, config_payload, config_entry)], async_add_entities)
         except Exception:
             raise
 
@@ -50,9 +54,12 @@ async def async_setup_entry(
     config_entry.async_on_unload(unsub)
 
 
-class CustomLight(LightEntity):
+class CustomLight(StateSnapshotMixin, LightEntity):
     """Custom entity class to handle business logic related to lights"""
 
+    """State keys of the device this entity is updated from"""
+    state_keys = frozenset({"on", "level", "kelvin", "rgb"})
+
     def turn_on(self, **kwargs: Any) -> None:
         pass
 
@@ -99,23 +106,8 @@ class CustomLight(LightEntity):
 
         self.update_state(config)
 
-        """Add a device state change event listener, and execute the specified method when the device state changes. 
-        Note: It is necessary to determine whether an event listener has been added here to avoid repeated additions."""
-        key = EVENT_ENTITY_STATE_UPDATE.format(self.unique_id)
-        if key not in hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT]:
-            unsub = async_dispatcher_connect(
-                hass, key, self.async_discover
-            )
-            hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT][key] = unsub
-            config_entry.async_on_unload(unsub)
-
-    @callback
-    def async_discover(self, data: dict) -> None:
-        try:
-            self.update_state(data)
-            self.async_write_ha_state()
-        except Exception:
-            raise
+        """Receive the state changes of the device through the gateway's routing table"""
+        hass.data[DOMAIN][config_entry.entry_id].async_add_route(config["unique_id"], self)
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -139,6 +131,9 @@ class CustomLight(LightEntity):
     def rgb_color(self) -> tuple[int, int, int] | None:
         return self._attr_rgb_color
 
+    def _state_snapshot(self) -> tuple:
+        return (self.on_off, self._attr_color_temp, self._attr_rgb_color, self._attr_brightness)
+
     def update_state(self, data):
         """Light event reporting changes the light state in HA"""
 
@@ -264,9 +259,14 @@ class CustomLight(LightEntity):
         if rgb is not None:
             message["data"]["rgb"] = rgb
 
-        await self.hass.data[MQTT_CLIENT_INSTANCE].async_publish(
+        """Only level, color temperature and color changes are coalesced, switching is always sent"""
+        attribute = None
+        if on is None:
+            attribute = ",".join(key for key in ("level", "kelvin", "rgb") if key in message["data"]) or None
+
+        await self.hass.data[MQTT_CLIENT_INSTANCE].async_send_command(
+            self.unique_id,
             "P/0/center/q20",
-            json.dumps(message),
-            0,
-            False
+            codec.dumps(message),
+            attribute
         )
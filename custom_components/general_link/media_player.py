@@ -1,19 +1,20 @@
 """Business logic for light entity."""
 from __future__ import annotations
 
-import json
 import logging
 from abc import ABC
 
 from homeassistant.components.media_player import MediaPlayerEntity, MediaType, MediaPlayerState, \
     MediaPlayerEntityFeature, RepeatMode
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import MQTT_CLIENT_INSTANCE, \
-    EVENT_ENTITY_REGISTER, EVENT_ENTITY_STATE_UPDATE, CACHE_ENTITY_STATE_UPDATE_KEY_DICT
+from . import codec
+from .const import DOMAIN, MQTT_CLIENT_INSTANCE, \
+    EVENT_ENTITY_REGISTER
+from .entity import StateSnapshotMixin
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,9 +29,12 @@ async def async_setup_entry(
     """This method is executed after the integration is initialized to create an event listener,
     which is used to create a sub-device"""
 
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
     async def async_discover(config_payload):
+        unique_id = config_payload["unique_id"]
         try:
-            async_add_entities([CustomMediaPlayer(hass, config_payload, config_entry)])
+            hub.async_add_entities(COMPONENT, unique_id, [CustomMediaPlayer(hass, config_payload, config_entry)], async_add_entities)
         except Exception:
             raise
 
@@ -41,11 +45,14 @@ async def async_setup_entry(
     config_entry.async_on_unload(unsub)
 
 
-class CustomMediaPlayer(MediaPlayerEntity, ABC):
+class CustomMediaPlayer(StateSnapshotMixin, MediaPlayerEntity, ABC):
     """Representation of a MPD server."""
 
     _attr_media_content_type = MediaType.MUSIC
 
+    """State keys of the device this entity is updated from"""
+    state_keys = frozenset({"playState", "volume", "silent", "playMode"})
+
     # pylint: disable=no-member
     def __init__(self, hass: HomeAssistant, config: dict, config_entry: ConfigEntry) -> None:
         """Initialize the MPD device."""
@@ -61,22 +68,11 @@ class CustomMediaPlayer(MediaPlayerEntity, ABC):
 
         self.update_state(config)
 
-        """Add a device state change event listener, and execute the specified method when the device state changes. 
-        Note: It is necessary to determine whether an event listener has been added here to avoid repeated additions."""
-        key = EVENT_ENTITY_STATE_UPDATE.format(self.unique_id)
-        if key not in hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT]:
-            unsub = async_dispatcher_connect(
-                hass, key, self.async_discover
-            )
-            hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT][key] = unsub
-            config_entry.async_on_unload(unsub)
-
-    @callback
-    def async_discover(self, data: dict) -> None:
-        try:
-            self.update_state(data)
-        except Exception:
-            raise
+        """Receive the state changes of the device through the gateway's routing table"""
+        hass.data[DOMAIN][config_entry.entry_id].async_add_route(config["unique_id"], self)
+
+    def _state_snapshot(self) -> tuple:
+        return (self._status, self._volume, self._muted, self._shuffle, self._repeat)
 
     def update_state(self, data):
         """Light event reporting changes the light state in HA"""
@@ -292,9 +288,9 @@ class CustomMediaPlayer(MediaPlayerEntity, ABC):
             "data": data
         }
 
-        await self.hass.data[MQTT_CLIENT_INSTANCE].async_publish(
+        await self.hass.data[MQTT_CLIENT_INSTANCE].async_send_command(
+            self.sn,
             "P/0/center/q56",
-            json.dumps(message),
-            0,
-            False
+            codec.dumps(message),
+            "volume" if data["action"] == 33 else None
         )
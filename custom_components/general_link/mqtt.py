@@ -1,12 +1,15 @@
 import asyncio
+import hashlib
 import logging
+import math
 import random
+import socket
 import time
-from functools import lru_cache
 from typing import Iterable, Any, Union
 import datetime as dt
 
 import attr
+from collections import OrderedDict, deque
 from collections.abc import Callable, Coroutine
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_PORT, CONF_USERNAME, CONF_PASSWORD
@@ -20,12 +23,54 @@ from homeassistant.util import dt as dt_util
 from paho.mqtt import client
 from paho.mqtt.client import MQTTMessage
 
+from . import codec
+from .command import CommandCoalescer, CommandScheduler, DEFAULT_COALESCE_WINDOW
 from .const import CONF_BROKER
 
 _LOGGER = logging.getLogger(__name__)
 
 TIMEOUT_ACK = 10
 CONF_KEEPALIVE = "keepalive"
+CONF_MAX_INFLIGHT = "max_inflight"
+CONF_TRANSPORT = "transport"
+CONF_COALESCE_WINDOW = "coalesce_window"
+
+DEFAULT_MAX_INFLIGHT = 20
+
+TRANSPORT_THREAD = "thread"
+TRANSPORT_ASYNCIO = "asyncio"
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Share of the in-flight window background publishes may use, and the minimum
+# spacing between them.
+BACKGROUND_WINDOW_SHARE = 0.5
+BACKGROUND_PUBLISH_INTERVAL = 0.05
+
+# Adaptive window: start small, grow by one slot per window of ACKs and halve
+# when the ACK latency exceeds LATENCY_TOLERANCE times the best one seen (but
+# at least LATENCY_FLOOR seconds) or an ACK times out.
+INITIAL_INFLIGHT = 4
+LATENCY_TOLERANCE = 3.0
+LATENCY_FLOOR = 0.05
+BASE_LATENCY_DRIFT = 1.01
+LATENCY_EWMA_WEIGHT = 0.2
+
+MAX_PACKETS_TO_READ = 500
+MISC_LOOP_INTERVAL = 1
+
+# Backoff between reconnect attempts of the asyncio transport, paho's network
+# thread reconnects by itself for the threaded one.
+RECONNECT_INTERVAL_MIN = 1
+RECONNECT_INTERVAL_MAX = 60
+
+INBOUND_BATCH_SIZE = 500
+
+# A payload identical to the previous one on its topic is dropped for this
+# long, for subscriptions asking for it. Digests are kept for this many topics.
+DEDUPE_TTL = 2
+DEDUPE_MAX_TOPICS = 1024
 
 PublishPayloadType = Union[str, bytes, int, float, None]
 ReceivePayloadType = Union[str, bytes]
@@ -49,18 +94,10 @@ def _raise_on_error(result_code: int | None) -> None:
     _raise_on_errors((result_code,))
 
 
-def _matcher_for_topic(subscription: str) -> Any:
-    # pylint: disable-next=import-outside-toplevel
-    from paho.mqtt.matcher import MQTTMatcher
-
-    matcher = MQTTMatcher()
-    matcher[subscription] = True
-
-    return lambda topic: next(matcher.iter_match(topic), False)
-
-
 SubscribePayloadType = Union[str, bytes]  # Only bytes if encoding is None
 
+_UNPARSED = object()
+
 
 @attr.s(slots=True, frozen=True)
 class ReceiveMessage:
@@ -72,6 +109,8 @@ class ReceiveMessage:
     retain: bool = attr.ib()
     subscribed_topic: str = attr.ib(default=None)
     timestamp: dt.datetime = attr.ib(default=None)
+    raw_payload: bytes = attr.ib(default=None)
+    parsed_payload: Any = attr.ib(default=None)
 
 
 @attr.s(slots=True, frozen=True)
@@ -79,26 +118,353 @@ class Subscription:
     """Class to hold data about an active subscription."""
 
     topic: str = attr.ib()
-    matcher: Any = attr.ib()
     job: HassJob[[ReceiveMessage], Coroutine[Any, Any, None] | None] = attr.ib()
     qos: int = attr.ib(default=0)
     encoding: str | None = attr.ib(default="utf-8")
+    parse_json: bool = attr.ib(default=False)
+    dedupe: bool = attr.ib(default=False)
 
 
-AsyncMessageCallbackType = Callable[[ReceiveMessage], Coroutine[Any, Any, None]]
-MessageCallbackType = Callable[[ReceiveMessage], None]
+class _TopicNode:
+    """A single level of the subscription trie."""
 
+    __slots__ = ("children", "subscriptions")
 
-@attr.s(slots=True, frozen=True)
-class ReceiveMessage:
-    """MQTT Message."""
+    def __init__(self) -> None:
+        self.children: dict[str, _TopicNode] = {}
+        self.subscriptions: list[Subscription] = []
 
-    topic: str = attr.ib()
-    payload: ReceivePayloadType = attr.ib()
-    qos: int = attr.ib()
-    retain: bool = attr.ib()
-    subscribed_topic: str = attr.ib(default=None)
-    timestamp: dt.datetime = attr.ib(default=None)
+
+class SubscriptionTrie:
+    """Index subscriptions by topic filter level for wildcard matching.
+
+    Adding or removing a subscription only touches the nodes along its own
+    filter, and a lookup walks at most the depth of the topic.
+    """
+
+    def __init__(self) -> None:
+        self._root = _TopicNode()
+
+    def add(self, subscription: Subscription) -> None:
+        """Add a subscription under its topic filter."""
+        node = self._root
+        for level in subscription.topic.split("/"):
+            node = node.children.setdefault(level, _TopicNode())
+        node.subscriptions.append(subscription)
+
+    def remove(self, subscription: Subscription) -> None:
+        """Remove a subscription and prune the nodes it leaves empty."""
+        levels = subscription.topic.split("/")
+        path = [self._root]
+        for level in levels:
+            node = path[-1].children.get(level)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].subscriptions.remove(subscription)
+        for level, node, parent in zip(
+                reversed(levels), reversed(path[1:]), reversed(path[:-1])
+        ):
+            if node.subscriptions or node.children:
+                break
+            del parent.children[level]
+
+    def match(self, topic: str) -> list[Subscription]:
+        """Return the subscriptions whose filter matches the topic."""
+        levels = topic.split("/")
+        last = len(levels)
+        # Wildcards at the first level never match topics starting with "$".
+        system_topic = topic.startswith("$")
+        matches: list[Subscription] = []
+        stack = [(self._root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            # "#" also matches the parent level, "sport/#" matches "sport".
+            if (multi := node.children.get("#")) is not None and (
+                    depth or not system_topic
+            ):
+                matches.extend(multi.subscriptions)
+            if depth == last:
+                matches.extend(node.subscriptions)
+                continue
+            if (child := node.children.get(levels[depth])) is not None:
+                stack.append((child, depth + 1))
+            if (single := node.children.get("+")) is not None and (
+                    depth or not system_topic
+            ):
+                stack.append((single, depth + 1))
+        return matches
+
+
+class PayloadDeduper:
+    """Spot payloads repeating the previous one received on their topic.
+
+    Only a digest of the last delivered payload of each topic is kept, for the
+    most recently used topics. A repeat is reported for ``ttl`` seconds after
+    the delivery, so a steady stream of repeats still gets through once per
+    ``ttl``.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, ttl: float, max_topics: int) -> None:
+        self._loop = loop
+        self._ttl = ttl
+        self._max_topics = max_topics
+        self._last: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def is_repeat(self, topic: str, payload: bytes) -> bool:
+        """Return True when the payload repeats the last one delivered on the topic."""
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        now = self._loop.time()
+        last = self._last.get(topic)
+        if last is not None:
+            self._last.move_to_end(topic)
+            if last[0] == digest and now - last[1] < self._ttl:
+                self.hits += 1
+                return True
+        self.misses += 1
+        self._last[topic] = (digest, now)
+        if len(self._last) > self._max_topics:
+            self._last.popitem(last=False)
+        return False
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the cache state for diagnostics."""
+        total = self.hits + self.misses
+        return {
+            "topics": len(self._last),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class AckTracker:
+    """Track the ACKs still owed by the broker.
+
+    Each pending mid maps to a future that resolves to True once acknowledged
+    or False when the ACK timed out. All mids share the same timeout, so their
+    deadlines are in insertion order and a single timer covers all of them.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, timeout: float) -> None:
+        self._loop = loop
+        self._timeout = timeout
+        self._pending: dict[int, tuple[asyncio.Future[bool], float]] = {}
+        # ACKs that arrived before their mid was tracked, by arrival time.
+        self._early: dict[int, float] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def track(self, mid: int) -> asyncio.Future[bool]:
+        """Return a future for the ACK of a mid."""
+        future: asyncio.Future[bool] = self._loop.create_future()
+        now = self._loop.time()
+        acked_at = self._early.pop(mid, None)
+        if acked_at is not None and now - acked_at < self._timeout:
+            future.set_result(True)
+            return future
+        self._pending[mid] = (future, now + self._timeout)
+        self._idle.clear()
+        if self._timer is None:
+            self._timer = self._loop.call_at(now + self._timeout, self._expire)
+        return future
+
+    def resolve(self, mid: int) -> None:
+        """Resolve the future of an acknowledged mid."""
+        entry = self._pending.pop(mid, None)
+        if entry is None:
+            self._early.pop(mid, None)
+            self._early[mid] = self._loop.time()
+            self._prune_early()
+            return
+        if not entry[0].done():
+            entry[0].set_result(True)
+        if not self._pending:
+            self._async_set_idle()
+
+    async def async_wait_idle(self) -> None:
+        """Wait until no ACK is pending."""
+        await self._idle.wait()
+
+    def _async_set_idle(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._idle.set()
+
+    def _prune_early(self) -> None:
+        """Forget early ACKs whose mid was never tracked, e.g. QoS 0 publishes."""
+        cutoff = self._loop.time() - self._timeout
+        early = self._early
+        while early:
+            mid, acked_at = next(iter(early.items()))
+            if acked_at >= cutoff:
+                break
+            del early[mid]
+
+    def _expire(self) -> None:
+        """Time out every mid whose deadline has passed."""
+        self._timer = None
+        now = self._loop.time()
+        pending = self._pending
+        while pending:
+            mid, (future, deadline) = next(iter(pending.items()))
+            if deadline > now:
+                self._timer = self._loop.call_at(deadline, self._expire)
+                return
+            del pending[mid]
+            _LOGGER.warning(
+                "No ACK from MQTT server in %s seconds (mid: %s)", self._timeout, mid
+            )
+            if not future.done():
+                future.set_result(False)
+        self._async_set_idle()
+
+
+class _QueuedPublish:
+    """Publish waiting to be handed to paho."""
+
+    __slots__ = ("topic", "payload", "qos", "retain", "priority", "ack", "sent_at")
+
+    def __init__(
+            self,
+            topic: str,
+            payload: PublishPayloadType,
+            qos: int,
+            retain: bool,
+            priority: int,
+            ack: asyncio.Future[None],
+    ) -> None:
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        self.priority = priority
+        self.ack = ack
+        self.sent_at = 0.0
+
+
+class InflightWindow:
+    """Bound the publishes awaiting their ACK, serving interactive ones first.
+
+    Background publishes only get a slot while no interactive publish is
+    waiting, may occupy at most BACKGROUND_WINDOW_SHARE of the window and are
+    spaced by at least BACKGROUND_PUBLISH_INTERVAL.
+
+    The size of the window follows the broker: it grows additively while ACKs
+    come back fast and is halved when they slow down or time out, never going
+    above ``max_limit``.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_limit: int) -> None:
+        self._loop = loop
+        self.max_limit = max_limit
+        self.limit = float(min(INITIAL_INFLIGHT, max_limit))
+        self._inflight = [0, 0]
+        self._waiters: tuple[deque[asyncio.Future[None]], ...] = (deque(), deque())
+        self._next_background = 0.0
+        self._base_latency = math.inf
+        self._latency = 0.0
+        self._last_backoff = 0.0
+        self.timeouts = 0
+        self.backoffs = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the window state for diagnostics."""
+        return {
+            "limit": int(self.limit),
+            "max_limit": self.max_limit,
+            "ack_latency": self._latency,
+            "base_ack_latency": None if self._base_latency == math.inf else self._base_latency,
+            "ack_timeouts": self.timeouts,
+            "backoffs": self.backoffs,
+            "interactive_inflight": self._inflight[PRIORITY_INTERACTIVE],
+            "background_inflight": self._inflight[PRIORITY_BACKGROUND],
+            "interactive_waiting": len(self._waiters[PRIORITY_INTERACTIVE]),
+            "background_waiting": len(self._waiters[PRIORITY_BACKGROUND]),
+        }
+
+    async def acquire(self, priority: int) -> None:
+        """Wait for a free slot in the window."""
+        if priority == PRIORITY_BACKGROUND:
+            now = self._loop.time()
+            delay = self._next_background - now
+            self._next_background = max(now, self._next_background) + BACKGROUND_PUBLISH_INTERVAL
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        if not any(self._waiters[: priority + 1]) and self._can_grant(priority):
+            self._inflight[priority] += 1
+            return
+
+        waiter: asyncio.Future[None] = self._loop.create_future()
+        self._waiters[priority].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just before the cancellation.
+                self.release(priority)
+            elif waiter in self._waiters[priority]:
+                self._waiters[priority].remove(waiter)
+            raise
+
+    def release(self, priority: int) -> None:
+        """Free a slot and hand it to the next waiter."""
+        self._inflight[priority] -= 1
+        self._wake()
+
+    def on_ack(self, latency: float, acked: bool) -> None:
+        """Adapt the window to the latency of an ACK or to its timeout."""
+        if acked:
+            self._base_latency = min(latency, self._base_latency * BASE_LATENCY_DRIFT)
+            self._latency += LATENCY_EWMA_WEIGHT * (latency - self._latency)
+            threshold = max(LATENCY_FLOOR, self._base_latency * LATENCY_TOLERANCE)
+            if latency <= threshold:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                return
+        else:
+            self.timeouts += 1
+        now = self._loop.time()
+        # Back off at most once per round trip, the ACKs of a slow burst all
+        # report the same congestion.
+        if now - self._last_backoff < max(self._latency, LATENCY_FLOOR):
+            return
+        self._last_backoff = now
+        self.backoffs += 1
+        self.limit = max(1.0, self.limit / 2)
+
+    def _wake(self) -> None:
+        """Hand free slots to waiters, interactive ones first."""
+        for lane, waiters in enumerate(self._waiters):
+            while waiters and self._can_grant(lane):
+                waiter = waiters.popleft()
+                if waiter.done():
+                    continue
+                self._inflight[lane] += 1
+                waiter.set_result(None)
+            if waiters:
+                return
+
+    def _can_grant(self, priority: int) -> bool:
+        limit = int(self.limit)
+        if sum(self._inflight) >= limit:
+            return False
+        if priority == PRIORITY_BACKGROUND:
+            return self._inflight[PRIORITY_BACKGROUND] < max(
+                1, int(limit * BACKGROUND_WINDOW_SHARE)
+            )
+        return True
+
+
+AsyncMessageCallbackType = Callable[[ReceiveMessage], Coroutine[Any, Any, None]]
+MessageCallbackType = Callable[[ReceiveMessage], None]
 
 
 class MqttClient:
@@ -118,16 +484,47 @@ class MqttClient:
         self.hass = hass
         self.config_entry = config_entry
         self.conf = conf
+        # Tuning comes from the options, which survive the connection data
+        # being replaced after an mDNS rescan.
+        tuning = {**conf, **config_entry.options}
         self._broker = conf[CONF_BROKER]
         self._port = conf[CONF_PORT]
         self._username = conf[CONF_USERNAME]
         self._password = conf[CONF_PASSWORD]
         self.connected = False
-        self._pending_operations: dict[int, asyncio.Event] = {}
+        self._connected_event = asyncio.Event()
+        self._acks = AckTracker(hass.loop, TIMEOUT_ACK)
+        self._scheduler = CommandScheduler(hass, self._async_publish_command)
+        self._coalescer = CommandCoalescer(
+            hass,
+            self._scheduler.async_send,
+            tuning.get(CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW),
+        )
         self.subscriptions: list[Subscription] = []
-        self._pending_operations_condition = asyncio.Condition()
+        self._subscription_trie = SubscriptionTrie()
+        self._deduper = PayloadDeduper(hass.loop, DEDUPE_TTL, DEDUPE_MAX_TOPICS)
         self._client.username_pw_set(self._username, password=self._password)
         self._paho_lock = asyncio.Lock()
+        self._max_inflight = tuning.get(CONF_MAX_INFLIGHT, DEFAULT_MAX_INFLIGHT)
+        self._client.max_inflight_messages_set(self._max_inflight)
+        self._inflight = InflightWindow(hass.loop, self._max_inflight)
+        self._publish_queue: list[_QueuedPublish] = []
+        self._loop_transport = tuning.get(CONF_TRANSPORT, TRANSPORT_THREAD) == TRANSPORT_ASYNCIO
+        self._misc_timer: asyncio.TimerHandle | None = None
+        self._reconnect_timer: asyncio.TimerHandle | None = None
+        self._reconnect_interval = RECONNECT_INTERVAL_MIN
+        self._stopping = False
+        # Filled by paho's network thread, drained in the event loop. Appends
+        # and pops on a deque are atomic, so no lock is needed.
+        self._inbound: deque[tuple[Callable[[Any], None], Any, float]] = deque()
+        self._inbound_drain_scheduled = False
+        self.metrics: dict[str, Any] = {
+            "inbound_batches": 0,
+            "inbound_last_batch_size": 0,
+            "inbound_max_batch_size": 0,
+            "inbound_last_drain_latency": 0.0,
+            "inbound_max_drain_latency": 0.0,
+        }
 
     def init_client(self) -> None:
         """Initialize paho client."""
@@ -137,6 +534,100 @@ class MqttClient:
         self._client.on_publish = self._mqtt_on_callback
         self._client.on_subscribe = self._mqtt_on_callback
         self._client.on_unsubscribe = self._mqtt_on_callback
+        if self._loop_transport:
+            self._client.on_socket_open = self._on_socket_open
+            self._client.on_socket_close = self._on_socket_close
+            self._client.on_socket_register_write = self._on_socket_register_write
+            self._client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    async def _async_client_call(self, target: Callable[..., Any], *args: Any) -> Any:
+        """Run a paho client call.
+
+        With the asyncio transport the event loop owns the socket and paho never
+        blocks, so the call runs inline instead of hopping to the executor.
+        """
+        if self._loop_transport:
+            return target(*args)
+        return await self.hass.async_add_executor_job(target, *args)
+
+    def _on_socket_open(
+            self, _mqttc: client.Client, _userdata: Any, sock: socket.socket
+    ) -> None:
+        """Socket opened callback, may run in the executor during connect."""
+        self._call_soon_on_loop(self._async_on_socket_open, sock)
+
+    @callback
+    def _async_on_socket_open(self, sock: socket.socket) -> None:
+        """Let the event loop drive reads, writes and keepalive of the socket."""
+        if sock.fileno() == -1:
+            return
+        self.hass.loop.add_reader(sock, self._async_reader_callback)
+        self.hass.loop.add_writer(sock, self._async_writer_callback)
+        if self._misc_timer is None:
+            self._async_misc_loop()
+
+    def _on_socket_close(
+            self, _mqttc: client.Client, _userdata: Any, sock: socket.socket
+    ) -> None:
+        """Socket closed callback, may run in the executor during reconnect.
+
+        Paho closes the socket right after this returns, so its fd is read now.
+        """
+        self._call_soon_on_loop(self._async_on_socket_close, sock.fileno())
+
+    @callback
+    def _async_on_socket_close(self, fileno: int) -> None:
+        """Stop watching a closed socket."""
+        if fileno != -1:
+            self.hass.loop.remove_reader(fileno)
+            self.hass.loop.remove_writer(fileno)
+        if self._misc_timer is not None:
+            self._misc_timer.cancel()
+            self._misc_timer = None
+
+    def _on_socket_register_write(
+            self, _mqttc: client.Client, _userdata: Any, sock: socket.socket
+    ) -> None:
+        """Paho has data to write."""
+        self._call_soon_on_loop(
+            self.hass.loop.add_writer, sock, self._async_writer_callback
+        )
+
+    def _on_socket_unregister_write(
+            self, _mqttc: client.Client, _userdata: Any, sock: socket.socket
+    ) -> None:
+        """Paho has nothing left to write, it may be about to close the socket."""
+        if (fileno := sock.fileno()) != -1:
+            self._call_soon_on_loop(self.hass.loop.remove_writer, fileno)
+
+    def _call_soon_on_loop(self, target: Callable[..., Any], *args: Any) -> None:
+        """Run socket bookkeeping in the event loop, right away when already in it."""
+        try:
+            in_loop = asyncio.get_running_loop() is self.hass.loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            target(*args)
+        else:
+            self.hass.loop.call_soon_threadsafe(target, *args)
+
+    @callback
+    def _async_reader_callback(self) -> None:
+        """Socket is readable."""
+        self._client.loop_read(MAX_PACKETS_TO_READ)
+
+    @callback
+    def _async_writer_callback(self) -> None:
+        """Socket is writable."""
+        self._client.loop_write()
+
+    @callback
+    def _async_misc_loop(self) -> None:
+        """Handle keepalive and retries, normally done by paho's network thread."""
+        self._client.loop_misc()
+        self._misc_timer = self.hass.loop.call_later(
+            MISC_LOOP_INTERVAL, self._async_misc_loop
+        )
 
     async def async_connect(self):
         """Connect to the host. Does not process messages yet."""
@@ -144,6 +635,7 @@ class MqttClient:
         self._username = self.conf[CONF_USERNAME]
         self._password = self.conf[CONF_PASSWORD]
         self._client.username_pw_set(self._username, password=self._password)
+        self._stopping = False
         result: int | None = None
         try:
             result = await self.hass.async_add_executor_job(
@@ -160,7 +652,8 @@ class MqttClient:
                 "Failed to connect to MQTT server: %s", client.error_string(result)
             )
 
-        self._client.loop_start()
+        if not self._loop_transport:
+            self._client.loop_start()
 
     async def async_disconnect(self) -> None:
         """Stop the MQTT client."""
@@ -170,17 +663,25 @@ class MqttClient:
             # Do not disconnect, we want the broker to always publish will
             self._client.loop_stop()
 
-        def no_more_acks() -> bool:
-            """Return False if there are unprocessed ACKs."""
-            return not bool(self._pending_operations)
+        self._stopping = True
+        if self._reconnect_timer is not None:
+            self._reconnect_timer.cancel()
+            self._reconnect_timer = None
 
-        # wait for ACKs to be processed
-        async with self._pending_operations_condition:
-            await self._pending_operations_condition.wait_for(no_more_acks)
+        # wait for ACKs to be processed, the asyncio transport still reads them
+        await self._acks.async_wait_idle()
+
+        if self._loop_transport:
+            if self._misc_timer is not None:
+                self._misc_timer.cancel()
+                self._misc_timer = None
+            if (sock := self._client.socket()) is not None:
+                self._async_on_socket_close(sock.fileno())
 
         # stop the MQTT loop
-        async with self._paho_lock:
-            await self.hass.async_add_executor_job(stop)
+        if not self._loop_transport:
+            async with self._paho_lock:
+                await self.hass.async_add_executor_job(stop)
 
     def _mqtt_on_connect(
             self, _mqttc: client, _userdata: None, _flags: dict[str, Any], result_code: int
@@ -196,9 +697,13 @@ class MqttClient:
                 "Unable to connect to the MQTT broker: %s",
                 client.connack_string(result_code),
             )
+            if self._loop_transport:
+                self._run_on_loop(self._async_schedule_reconnect)
             return
 
+        self._reconnect_interval = RECONNECT_INTERVAL_MIN
         self.connected = True
+        self._run_on_loop(self._async_set_connected, True)
         dispatcher_send(self.hass, "mqtt_connected")
         _LOGGER.warning(
             "Connected to MQTT server %s:%s (%s)",
@@ -209,7 +714,7 @@ class MqttClient:
 
         # Group subscriptions to only re-subscribe once for each topic.
         keyfunc = attrgetter("topic")
-        self.hass.add_job(
+        self._run_on_loop(
             self._async_perform_subscriptions,
             [
                 # Re-subscribe with the highest requested qos
@@ -226,19 +731,26 @@ class MqttClient:
             msg_callback: AsyncMessageCallbackType | MessageCallbackType,
             qos: int,
             encoding: str | None = None,
+            parse_json: bool = False,
+            dedupe: bool = False,
     ) -> Callable[[], None]:
         """Set up a subscription to a topic with the provided qos.
 
+        With ``parse_json`` the callback receives the payload already parsed
+        in ``parsed_payload`` and messages that are not valid JSON are dropped.
+        With ``dedupe`` a payload repeating the previous one on its topic
+        within ``DEDUPE_TTL`` seconds is dropped before being parsed.
+
         This method is a coroutine.
         """
         if not isinstance(topic, str):
             raise HomeAssistantError("Topic needs to be a string!")
 
         subscription = Subscription(
-            topic, _matcher_for_topic(topic), HassJob(msg_callback), qos, encoding
+            topic, HassJob(msg_callback), qos, encoding, parse_json, dedupe
         )
         self.subscriptions.append(subscription)
-        self._matching_subscriptions.cache_clear()
+        self._subscription_trie.add(subscription)
 
         # Only subscribe if currently connected.
         if self.connected:
@@ -251,7 +763,7 @@ class MqttClient:
             if subscription not in self.subscriptions:
                 raise HomeAssistantError("Can't remove subscription twice")
             self.subscriptions.remove(subscription)
-            self._matching_subscriptions.cache_clear()
+            self._subscription_trie.remove(subscription)
 
             # Only unsubscribe if currently connected
             if self.connected:
@@ -274,15 +786,13 @@ class MqttClient:
             return subscribe_result_list
 
         async with self._paho_lock:
-            results = await self.hass.async_add_executor_job(
-                _process_client_subscriptions
-            )
+            results = await self._async_client_call(_process_client_subscriptions)
 
         tasks = []
         errors = []
         for result, mid in results:
             if result == 0:
-                tasks.append(self._wait_for_mid(mid))
+                tasks.append(self._acks.track(mid))
             else:
                 errors.append(result)
 
@@ -297,6 +807,7 @@ class MqttClient:
         """Disconnected callback."""
         _LOGGER.warning("Disconnected ===============================================================")
         self.connected = False
+        self._run_on_loop(self._async_set_connected, False)
         dispatcher_send(self.hass, "mqtt_disconnected")
         _LOGGER.warning(
             "Disconnected from MQTT server %s:%s (%s)",
@@ -304,12 +815,117 @@ class MqttClient:
             self.conf[CONF_PORT],
             result_code,
         )
+        if self._loop_transport:
+            self._run_on_loop(self._async_schedule_reconnect)
+
+    @callback
+    def _async_schedule_reconnect(self) -> None:
+        """Reconnect the asyncio transport after a drop, backing off between attempts."""
+        if self._stopping or self._reconnect_timer is not None:
+            return
+        delay = self._reconnect_interval
+        self._reconnect_interval = min(delay * 2, RECONNECT_INTERVAL_MAX)
+        self._reconnect_timer = self.hass.loop.call_later(
+            delay, lambda: self.hass.async_create_task(self._async_reconnect())
+        )
+
+    async def _async_reconnect(self) -> None:
+        """Reconnect attempt, its timer stays set meanwhile so drops do not start another."""
+        try:
+            if self._stopping or self.connected:
+                return
+            result = await self.hass.async_add_executor_job(self._client.reconnect)
+        except OSError as err:
+            _LOGGER.warning("Failed to reconnect to MQTT server: %s", err)
+            result = None
+        finally:
+            self._reconnect_timer = None
+        if result != client.MQTT_ERR_SUCCESS:
+            self._async_schedule_reconnect()
+
+    @callback
+    def _async_set_connected(self, connected: bool) -> None:
+        """Wake up or reset the waiters of async_wait_connected."""
+        if connected:
+            self._connected_event.set()
+        else:
+            self._connected_event.clear()
+
+    async def async_wait_connected(self, timeout: float) -> bool:
+        """Wait until the broker accepted the connection.
+
+        Returns whether the client is connected, at the latest after ``timeout``
+        seconds.
+        """
+        if self.connected:
+            return True
+        try:
+            await asyncio.wait_for(self._connected_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self.connected
 
     def _mqtt_on_message(
             self, _mqttc: client, _userdata: None, msg: MQTTMessage
     ) -> None:
         """Message received callback."""
-        self.hass.add_job(self._mqtt_handle_message, msg)
+        self._push_inbound(self._mqtt_handle_message, msg)
+
+    def _push_inbound(self, handler: Callable[[Any], None], arg: Any) -> None:
+        """Hand a message or ACK from paho to the event loop.
+
+        From paho's network thread the work is queued and a single drain is
+        scheduled for all of it, instead of one loop callback per item.
+        """
+        if self._loop_transport:
+            handler(arg)
+            return
+        self._inbound.append((handler, arg, time.monotonic()))
+        if not self._inbound_drain_scheduled:
+            self._inbound_drain_scheduled = True
+            self.hass.loop.call_soon_threadsafe(self._async_drain_inbound)
+
+    @callback
+    def _async_drain_inbound(self) -> None:
+        """Process up to INBOUND_BATCH_SIZE queued messages and ACKs."""
+        # Reset first, anything queued from now on schedules another drain.
+        self._inbound_drain_scheduled = False
+        inbound = self._inbound
+        if not inbound:
+            return
+        latency = time.monotonic() - inbound[0][2]
+        size = 0
+        while inbound and size < INBOUND_BATCH_SIZE:
+            handler, arg, _queued_at = inbound.popleft()
+            size += 1
+            try:
+                handler(arg)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error handling MQTT message %s", arg)
+        if inbound:
+            # Leave the rest for the next iteration to keep the loop responsive.
+            self._inbound_drain_scheduled = True
+            self.hass.loop.call_soon(self._async_drain_inbound)
+
+        metrics = self.metrics
+        metrics["inbound_batches"] += 1
+        metrics["inbound_last_batch_size"] = size
+        metrics["inbound_max_batch_size"] = max(metrics["inbound_max_batch_size"], size)
+        metrics["inbound_last_drain_latency"] = latency
+        metrics["inbound_max_drain_latency"] = max(
+            metrics["inbound_max_drain_latency"], latency
+        )
+
+    def _run_on_loop(self, target: Callable[..., Any], *args: Any) -> None:
+        """Run a paho callback's work in the event loop.
+
+        Paho calls back from its network thread unless the asyncio transport
+        is used, in which case we are already in the event loop.
+        """
+        if self._loop_transport:
+            self.hass.async_run_hass_job(HassJob(target), *args)
+        else:
+            self.hass.add_job(target, *args)
 
     async def _async_unsubscribe(self, topic: str) -> None:
         """Unsubscribe from a topic.
@@ -331,18 +947,8 @@ class MqttClient:
             return
 
         async with self._paho_lock:
-            mid = await self.hass.async_add_executor_job(_client_unsubscribe, topic)
-            await self._register_mid(mid)
-
-        self.hass.async_create_task(self._wait_for_mid(mid))
-
-    @lru_cache(2048)
-    def _matching_subscriptions(self, topic: str) -> list[Subscription]:
-        subscriptions: list[Subscription] = []
-        for subscription in self.subscriptions:
-            if subscription.matcher(topic):
-                subscriptions.append(subscription)
-        return subscriptions
+            mid = await self._async_client_call(_client_unsubscribe, topic)
+            self._acks.track(mid)
 
     @callback
     def _mqtt_handle_message(self, msg: MQTTMessage) -> None:
@@ -354,23 +960,43 @@ class MqttClient:
         )
         timestamp = dt_util.utcnow()
 
-        subscriptions = self._matching_subscriptions(msg.topic)
+        subscriptions = self._subscription_trie.match(msg.topic)
 
+        # Decode and parse every message once, whatever the number of
+        # subscriptions it is delivered to.
+        decoded: dict[str, str | None] = {}
+        parsed: Any = _UNPARSED
+        repeat: bool | None = None
         for subscription in subscriptions:
 
+            if subscription.dedupe:
+                if repeat is None:
+                    repeat = self._deduper.is_repeat(msg.topic, msg.payload)
+                if repeat:
+                    continue
+
             payload: SubscribePayloadType = msg.payload
-            if subscription.encoding is not None:
-                try:
-                    payload = msg.payload.decode(subscription.encoding)
-                except (AttributeError, UnicodeDecodeError):
-                    _LOGGER.warning(
-                        "Can't decode payload %s on %s with encoding %s (for %s)",
-                        msg.payload[0:8192],
-                        msg.topic,
-                        subscription.encoding,
-                        subscription.job,
-                    )
+            if (encoding := subscription.encoding) is not None:
+                if encoding not in decoded:
+                    try:
+                        decoded[encoding] = msg.payload.decode(encoding)
+                    except (AttributeError, UnicodeDecodeError):
+                        _LOGGER.warning(
+                            "Can't decode payload %s on %s with encoding %s",
+                            msg.payload[0:8192],
+                            msg.topic,
+                            encoding,
+                        )
+                        decoded[encoding] = None
+                if (payload := decoded[encoding]) is None:
+                    continue
+            parsed_payload = None
+            if subscription.parse_json:
+                if parsed is _UNPARSED:
+                    parsed = self._parse_json(msg)
+                if parsed is None:
                     continue
+                parsed_payload = parsed
             self.hass.async_run_hass_job(
                 subscription.job,
                 ReceiveMessage(
@@ -380,9 +1006,25 @@ class MqttClient:
                     msg.retain,
                     subscription.topic,
                     timestamp,
+                    msg.payload,
+                    parsed_payload,
                 ),
             )
 
+    @staticmethod
+    def _parse_json(msg: MQTTMessage) -> Any:
+        """Parse a JSON payload straight from the received bytes."""
+        if not msg.payload:
+            _LOGGER.warning("Empty JSON payload on %s", msg.topic)
+            return None
+        try:
+            return codec.loads(msg.payload)
+        except ValueError:
+            _LOGGER.warning(
+                "Unable to parse JSON on %s: '%s'", msg.topic, msg.payload[0:8192]
+            )
+            return None
+
     def _mqtt_on_callback(
             self,
             _mqttc: client,
@@ -391,44 +1033,128 @@ class MqttClient:
             _granted_qos: tuple[Any, ...] | None = None,
     ) -> None:
         """Publish / Subscribe / Unsubscribe callback."""
-        self.hass.add_job(self._mqtt_handle_mid, mid)
+        self._push_inbound(self._async_handle_mid, mid)
 
-    async def _mqtt_handle_mid(self, mid: int) -> None:
-        # Create the mid event if not created, either _mqtt_handle_mid or _wait_for_mid
-        # may be executed first.
-        await self._register_mid(mid)
-        self._pending_operations[mid].set()
+    @callback
+    def _async_handle_mid(self, mid: int) -> None:
+        self._acks.resolve(mid)
 
-    async def async_publish(
-            self, topic: str, payload: PublishPayloadType, qos: int, retain: bool
+    async def async_send_command(
+            self,
+            target: str,
+            topic: str,
+            payload: PublishPayloadType,
+            attribute: str | None = None,
     ) -> None:
-        """Publish a MQTT message."""
+        """Send a device command.
+
+        ``target`` is the device sn, or room-subgroup for light groups. Commands
+        that set an ``attribute`` are coalesced: while an earlier value for the
+        same target and attribute is still queued, only the latest one is sent.
+        Commands for one target are sent strictly in order, commands for
+        different targets concurrently.
+        """
+        await self._coalescer.async_send(target, topic, payload, attribute)
+
+    async def _async_publish_command(
+            self, topic: str, payload: PublishPayloadType
+    ) -> None:
+        await self.async_publish(topic, payload, 0, False)
+
+    async def async_publish(
+            self,
+            topic: str,
+            payload: PublishPayloadType,
+            qos: int,
+            retain: bool,
+            wait_for_ack: bool = True,
+            priority: int = PRIORITY_INTERACTIVE,
+    ) -> asyncio.Future[None]:
+        """Publish a MQTT message.
+
+        Up to ``max_inflight`` messages may be waiting for their ACK at the same
+        time, fewer while the broker is slow to acknowledge, and messages
+        queued while paho is busy are handed to it in a single executor job.
+        Background publishes are paced and only take a slot when no
+        interactive publish is waiting. The returned future resolves once the
+        broker acknowledged the message; with ``wait_for_ack`` set it is
+        awaited before returning.
+        """
+        await self._inflight.acquire(priority)
+        ack: asyncio.Future[None] = self.hass.loop.create_future()
+        self._publish_queue.append(
+            _QueuedPublish(topic, payload, qos, retain, priority, ack)
+        )
+        if len(self._publish_queue) == 1:
+            self.hass.async_create_task(self._async_flush_publishes())
+        if wait_for_ack:
+            await ack
+        return ack
+
+    async def _async_flush_publishes(self) -> None:
+        """Hand all queued publishes to paho in one call."""
+
+        def _process_client_publishes(
+                batch: list[_QueuedPublish],
+        ) -> list[client.MQTTMessageInfo]:
+            """Publish a batch of messages and return their message infos."""
+            return [
+                self._client.publish(item.topic, item.payload, item.qos, item.retain)
+                for item in batch
+            ]
+
         async with self._paho_lock:
-            msg_info = await self.hass.async_add_executor_job(
-                self._client.publish, topic, payload, qos, retain
-            )
-            _raise_on_error(msg_info.rc)
-        await self._wait_for_mid(msg_info.mid)
-
-    async def _wait_for_mid(self, mid: int) -> None:
-        """Wait for ACK from broker."""
-        # Create the mid event if not created, either _mqtt_handle_mid or _wait_for_mid
-        # may be executed first.
-        await self._register_mid(mid)
-        try:
-            await asyncio.wait_for(self._pending_operations[mid].wait(), TIMEOUT_ACK)
-        except asyncio.TimeoutError:
-            _LOGGER.warning(
-                "No ACK from MQTT server in %s seconds (mid: %s)", TIMEOUT_ACK, mid
+            batch, self._publish_queue = self._publish_queue, []
+            if not batch:
+                return
+            # Interactive messages go out ahead of background ones.
+            batch.sort(key=attrgetter("priority"))
+            sent_at = self.hass.loop.time()
+            for item in batch:
+                item.sent_at = sent_at
+            try:
+                results = await self._async_client_call(
+                    _process_client_publishes, batch
+                )
+            except Exception as err:  # pylint: disable=broad-except
+                for item in batch:
+                    self._inflight.release(item.priority)
+                    if not item.ack.done():
+                        item.ack.set_exception(err)
+                return
+
+        for item, msg_info in zip(batch, results):
+            if msg_info.rc != 0:
+                self._inflight.release(item.priority)
+                if not item.ack.done():
+                    item.ack.set_exception(
+                        HomeAssistantError(
+                            f"Error talking to MQTT: {client.error_string(msg_info.rc)}"
+                        )
+                    )
+                continue
+            if item.qos == 0 and msg_info.is_published():
+                # Nothing more to wait for once paho has written a QoS 0 message.
+                self._complete_publish(item, True)
+                continue
+            self._acks.track(msg_info.mid).add_done_callback(
+                lambda acked, item=item: self._complete_publish(item, acked.result())
             )
-        finally:
-            async with self._pending_operations_condition:
-                # Cleanup ACK sync buffer
-                del self._pending_operations[mid]
-                self._pending_operations_condition.notify_all()
-
-    async def _register_mid(self, mid: int) -> None:
-        """Create Event for an expected ACK."""
-        async with self._pending_operations_condition:
-            if mid not in self._pending_operations:
-                self._pending_operations[mid] = asyncio.Event()
+
+    @callback
+    def _complete_publish(self, item: _QueuedPublish, acked: bool) -> None:
+        """Resolve a publish future, adapt the window and free its slot."""
+        self._inflight.on_ack(self.hass.loop.time() - item.sent_at, acked)
+        self._inflight.release(item.priority)
+        if not item.ack.done():
+            item.ack.set_result(None)
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return counters describing the client's queues."""
+        return {
+            **self.metrics,
+            "publish_window": self._inflight.as_dict(),
+            "command_shards": self._scheduler.active_shards,
+            "commands_superseded": self._coalescer.superseded,
+            "dedupe": self._deduper.as_dict(),
+        }
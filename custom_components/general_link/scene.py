@@ -1,7 +1,6 @@
 """Business logic for scene entity."""
 from __future__ import annotations
 
-import json
 import logging
 from typing import Any
 
@@ -12,6 +11,7 @@ from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from . import codec
 from .const import DOMAIN, MQTT_CLIENT_INSTANCE, EVENT_ENTITY_REGISTER, MANUFACTURER
 
 _LOGGER = logging.getLogger(__name__)
@@ -27,9 +27,12 @@ async def async_setup_entry(
     """This method is executed after the integration is initialized to create an event listener,
      which is used to create a sub-device"""
 
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
     async def async_discover(config_payload):
+        unique_id = config_payload["unique_id"]
         try:
-            async_add_entities([CustomScene(hass, config_payload, config_entry)])
+            hub.async_add_entities(COMPONENT, unique_id, [CustomScene(hass, config_payload, config_entry)], async_add_entities)
         except Exception:
             raise
 
@@ -89,9 +92,8 @@ class CustomScene(Scene):
             }
         }
 
-        await self.hass.data[MQTT_CLIENT_INSTANCE].async_publish(
+        await self.hass.data[MQTT_CLIENT_INSTANCE].async_send_command(
+            f"scene-{self.id}",
             "P/0/center/q30",
-            json.dumps(message),
-            0,
-            False
+            codec.dumps(message)
         )
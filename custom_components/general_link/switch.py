@@ -1,7 +1,6 @@
 """Business logic for switch entity."""
 from __future__ import annotations
 
-import json
 import logging
 from abc import ABC
 from homeassistant.components.switch import SwitchEntity
@@ -11,8 +10,10 @@ from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from . import codec
 from .const import DOMAIN, MQTT_CLIENT_INSTANCE, \
-    EVENT_ENTITY_REGISTER, EVENT_ENTITY_STATE_UPDATE, CACHE_ENTITY_STATE_UPDATE_KEY_DICT, MANUFACTURER
+    EVENT_ENTITY_REGISTER, MANUFACTURER
+from .entity import StateSnapshotMixin
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,7 +28,10 @@ async def async_setup_entry(
     """This method is executed after the integration is initialized to create an event listener,
     which is used to create a sub-device"""
 
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
     async def async_discover(config_payload):
+        unique_id = config_payload["unique_id"]
         try:
             if "relaysNum" in config_payload:
                 relays = config_payload["relays"]
@@ -43,7 +47,7 @@ async def async_setup_entry(
                     config_payload["dname"] = name
                     config_payload["name"] = f"{name}-{relaysName}"
                     config_payload["on"] = state
-                    async_add_entities([CustomSwitch(hass, config_payload, config_entry)])
+                    hub.async_add_entities(COMPONENT, unique_id, [CustomSwitch(hass, config_payload, config_entry)], async_add_entities)
         except Exception:
             raise
 
@@ -54,11 +58,14 @@ async def async_setup_entry(
     config_entry.async_on_unload(unsub)
 
 
-class CustomSwitch(SwitchEntity, ABC):
+class CustomSwitch(StateSnapshotMixin, SwitchEntity, ABC):
     """Custom entity class to handle business logic related to switchs"""
 
     should_poll = False
 
+    """State keys of the device this entity is updated from"""
+    state_keys = frozenset({"relays"})
+
     device_class = COMPONENT
 
     def __init__(self, hass: HomeAssistant, config: dict, config_entry: ConfigEntry) -> None:
@@ -82,23 +89,15 @@ class CustomSwitch(SwitchEntity, ABC):
 
         self.update_state(config)
 
-        """Add a device state change event listener, and execute the specified method when the device state changes. 
-        Note: It is necessary to determine whether an event listener has been added here to avoid repeated additions."""
-        key = EVENT_ENTITY_STATE_UPDATE.format(self.unique_id)
-        if key not in hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT]:
-            unsub = async_dispatcher_connect(
-                hass, key, self.async_discover
-            )
-            hass.data[CACHE_ENTITY_STATE_UPDATE_KEY_DICT][key] = unsub
-            config_entry.async_on_unload(unsub)
+        """Receive the state changes of the device through the gateway's routing table"""
+        hass.data[DOMAIN][config_entry.entry_id].async_add_route(config["sn"], self)
 
     @callback
-    def async_discover(self, data: dict) -> None:
-        try:
-            self.update_state(data)
-            self.async_write_ha_state()
-        except Exception:
-            raise
+    def async_discover(self, data: dict) -> bool:
+        """The device reports the state of all its relays"""
+        if "relays" not in data:
+            return False
+        return super().async_discover({"on": data["relays"][self.relay]})
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -115,6 +114,9 @@ class CustomSwitch(SwitchEntity, ABC):
         """Return true if switch is on."""
         return self._state
 
+    def _state_snapshot(self) -> tuple:
+        return (self._state,)
+
     def update_state(self, data):
         """Switch event reporting changes the switch state in HA"""
         if "on" in data:
@@ -150,9 +152,8 @@ class CustomSwitch(SwitchEntity, ABC):
         message["data"]["relay"] = self.relay
         message["data"]["sn"] = self.sn
         message["data"]["state"] = int(on)
-        await self.hass.data[MQTT_CLIENT_INSTANCE].async_publish(
+        await self.hass.data[MQTT_CLIENT_INSTANCE].async_send_command(
+            self.sn,
             "P/0/center/q68",
-            json.dumps(message),
-            0,
-            False
+            codec.dumps(message)
         )